@@ -4,27 +4,60 @@
 AI Анализатор событий (OpenRouter - бесплатный Google Gemini)
 """
 
-import requests
 import json
 import logging
+import re
+import threading
 from datetime import datetime
 
+from logs.metrics import metrics
+from scraper.http_client import get_http_client
+
 logger = logging.getLogger(__name__)
 
+MODEL = "google/gemini-2.0-flash-exp:free"
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Меняйте при правке промпта: старые вердикты в кэше перестанут совпадать
+PROMPT_VERSION = "1"
+# Пакетный промпт и формат ответа другие — его вердикты кэшируются отдельно
+BATCH_PROMPT_VERSION = "batch-1"
+
 class EventAnalyzer:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, http_client=None, cache=None, endpoint=OPENROUTER_URL, local_model=None, confidence=0.9, rate_limiter=None):
         self.api_key = api_key or ""
-        self.endpoint = "https://openrouter.ai/api/v1/chat/completions"
+        self.http = http_client or get_http_client()
+        self.endpoint = endpoint
+        self.model = MODEL
+        # data.analysis_cache.AnalysisCache или None
+        self.cache = cache
+        # ai.rate_limiter.TokenBucket или None — ограничение частоты запросов к модели
+        # (попадания в кэш и решения локальной модели его не тратят)
+        self.rate_limiter = rate_limiter
+        # ai.local_model.QualityModel или None: уверенный (от confidence) отказ модели — без LLM
+        self.local_model = local_model
+        self.confidence = confidence
+        self.local_decisions = 0
+        self._lock = threading.Lock()
     
     def analyze_quality(self, event):
         """Анализ качества события (0-10) + фильтрация мата + извлечение данных"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(event, self.model, PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        local = self._local_analysis([event])[0]
+        if local is not None:
+            return local
         
         prompt = f"""Анализируй событие:
-Название: {event.get('title', '')}
-Описание: {event.get('description', '')}
-Дата: {event.get('date', '')}
-Место: {event.get('place', '')}
-Цена: {event.get('price', '')}
+Название: {event.title}
+Описание: {event.description}
+Дата: {event.date}
+Место: {event.place}
+Цена: {event.price_text}
 
 ЗАДАЧИ:
 1. Оценка качества: от 0 (мусор) до 10 (отличное)
@@ -44,31 +77,15 @@ class EventAnalyzer:
 }}"""
         
         try:
-            # Используем бесплатный Gemini через OpenRouter
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            content = self._complete(prompt, timeout=10)
             
-            data = {
-                "model": "google/gemini-2.0-flash-exp:free",
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3
-            }
-            
-            response = requests.post(self.endpoint, json=data, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                
+            if content:
                 # Парсим JSON из ответа
-                import re
                 json_match = re.search(r'\{.*\}', content, re.DOTALL)
                 if json_match:
                     analysis = json.loads(json_match.group())
+                    if cache_key is not None:
+                        self.cache.put(cache_key, event, analysis, self.model, PROMPT_VERSION)
                     return analysis
             
             # Fallback анализ без AI
@@ -78,10 +95,197 @@ class EventAnalyzer:
             logger.error(f"AI анализ ошибка: {e}")
             return self._fallback_analysis(event)
     
+    def analyze_many(self, events, batch_size=10):
+        """Пакетный анализ: несколько событий в одном запросе к модели.
+        
+        Возвращает список анализов в порядке events. Элементы, которые модель
+        не вернула или вернула битыми, получают _fallback_analysis.
+        """
+        results = [None] * len(events)
+        pending = []
+        
+        for i, event in enumerate(events):
+            if self.cache is not None:
+                cache_key = self.cache.make_key(event, self.model, BATCH_PROMPT_VERSION)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            else:
+                cache_key = None
+            pending.append((i, cache_key))
+        
+        # Уверенные отказы локальной модели — без запроса (и не в кэш: он учит модель)
+        if pending and self.local_model is not None:
+            local = self._local_analysis([events[i] for i, _ in pending])
+            for (i, _), analysis in zip(pending, local):
+                results[i] = analysis
+            pending = [item for item, analysis in zip(pending, local) if analysis is None]
+        
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            parsed = self._analyze_batch([events[i] for i, _ in batch])
+            
+            for pos, (i, cache_key) in enumerate(batch):
+                analysis = parsed.get(pos)
+                if analysis is None:
+                    results[i] = self._fallback_analysis(events[i])
+                    continue
+                if cache_key is not None:
+                    self.cache.put(cache_key, events[i], analysis, self.model, BATCH_PROMPT_VERSION)
+                results[i] = analysis
+        
+        return results
+    
+    def _local_analysis(self, events):
+        """Отказы локальной модели; None там, где решает LLM.
+
+        Мат и запрещённый контент модель не видит, поэтому пропуск за ней не остаётся
+        """
+        if self.local_model is None:
+            return [None] * len(events)
+        results = []
+        with metrics.timer('ai.local'):
+            scores = self.local_model.predict_many(events)
+        for event, (probability, quality) in zip(events, scores):
+            if self.local_model.is_sure_reject(probability, self.confidence):
+                results.append(self.local_model.analysis(event, probability, quality))
+            else:
+                results.append(None)
+        decided = sum(analysis is not None for analysis in results)
+        with self._lock:
+            self.local_decisions += decided
+        metrics.count('ai.local.decided', decided)
+        metrics.count('ai.local.escalated', len(events) - decided)
+        return results
+    
+    def _analyze_batch(self, events):
+        """Один запрос на пачку событий: {позиция в пачке: проверенный анализ}"""
+        blocks = []
+        for i, event in enumerate(events):
+            blocks.append(f"""[id={i}]
+Название: {event.title}
+Описание: {event.description}
+Дата: {event.date}
+Место: {event.place}
+Цена: {event.price_text}""")
+        
+        prompt = f"""Анализируй события (их {len(events)}):
+
+{chr(10).join(blocks)}
+
+ЗАДАЧИ для КАЖДОГО события:
+1. Оценка качества: от 0 (мусор) до 10 (отличное)
+2. Есть ли мат или незаконный контент? (да/нет)
+3. Когда происходит событие? (дата в формате DD.MM.YYYY или "не указано")
+4. Где происходит? (адрес или место)
+5. Краткое описание (макс 100 символов)
+
+Ответь JSON массивом, по одному объекту на событие, с его id:
+[
+  {{
+    "id": 0,
+    "quality": 8,
+    "has_bad_content": false,
+    "event_date": "27.10.2025",
+    "event_location": "Москва, ул. Петровка, 17",
+    "summary": "Концерт...",
+    "is_relevant": true
+  }}
+]"""
+        
+        try:
+            content = self._complete(prompt, timeout=10 + 3 * len(events))
+        except Exception as e:
+            logger.error(f"AI пакетный анализ ошибка: {e}")
+            return {}
+        
+        if not content:
+            return {}
+        
+        json_match = re.search(r'\[.*\]', content, re.DOTALL)
+        if not json_match:
+            logger.warning("AI пакетный анализ: в ответе нет JSON массива")
+            return {}
+        
+        try:
+            items = json.loads(json_match.group())
+        except ValueError as e:
+            logger.warning(f"AI пакетный анализ: битый JSON ({e})")
+            return {}
+        
+        parsed = {}
+        for item in items if isinstance(items, list) else []:
+            analysis = self._validate_item(item, len(events))
+            if analysis is not None:
+                parsed[analysis.pop('id')] = analysis
+        
+        if len(parsed) < len(events):
+            logger.warning(f"AI пакетный анализ: разобрано {len(parsed)} из {len(events)}")
+        return parsed
+    
+    def _validate_item(self, item, batch_len):
+        """Проверка одного элемента ответа; None — если элемент непригоден"""
+        if not isinstance(item, dict):
+            return None
+        
+        try:
+            item_id = int(item.get('id'))
+            quality = int(item.get('quality'))
+        except (TypeError, ValueError):
+            return None
+        
+        if not 0 <= item_id < batch_len or not 0 <= quality <= 10:
+            return None
+        
+        has_bad = item.get('has_bad_content')
+        if not isinstance(has_bad, bool):
+            return None
+        
+        return {
+            "id": item_id,
+            "quality": quality,
+            "has_bad_content": has_bad,
+            "event_date": str(item.get('event_date') or 'не указано'),
+            "event_location": str(item.get('event_location') or 'не указано'),
+            "summary": str(item.get('summary') or '')[:100],
+            "is_relevant": bool(item.get('is_relevant', quality >= 5 and not has_bad))
+        }
+    
+    def _complete(self, prompt, timeout=10):
+        """Запрос к модели: текст ответа или None"""
+        # Используем бесплатный Gemini через OpenRouter
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3
+        }
+        
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        
+        metrics.count('ai.calls')
+        with metrics.timer('ai.call'):
+            response = self.http.post(self.endpoint, json=data, headers=headers, timeout=timeout)
+        
+        if response.status_code != 200:
+            logger.warning(f"AI: HTTP {response.status_code}")
+            return None
+        
+        result = response.json()
+        return result['choices'][0]['message']['content']
+    
     def _fallback_analysis(self, event):
         """Базовый анализ без AI"""
-        description = event.get('description', '').lower()
-        title = event.get('title', '').lower()
+        description = event.description.lower()
+        title = event.title.lower()
         
         # Проверка мата
         bad_words = ['мат', 'взрослый контент']
@@ -89,20 +293,20 @@ class EventAnalyzer:
         
         # Оценка качества по наличию данных
         quality = 5
-        if event.get('place'):
+        if event.place:
             quality += 2
-        if event.get('description'):
+        if event.description:
             quality += 1
-        if event.get('price'):
+        if event.price_text:
             quality += 1
-        if event.get('url'):
+        if event.url:
             quality += 1
         
         return {
             "quality": min(quality, 10),
             "has_bad_content": has_bad,
-            "event_date": event.get('date', 'не указано'),
-            "event_location": event.get('place', 'не указано'),
-            "summary": event.get('description', '')[:100],
+            "event_date": event.date or 'не указано',
+            "event_location": event.place or 'не указано',
+            "summary": event.description[:100],
             "is_relevant": quality >= 5 and not has_bad
         }
\ No newline at end of file
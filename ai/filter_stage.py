@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Параллельная AI фильтрация событий с ограничением частоты запросов
+Сохраняет исходный порядок и останавливается, набрав нужное число событий
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.prefilter import ASK_LLM, REJECT
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisStage:
+    def __init__(self, analyzer, workers=4, batch_size=10, min_quality=5):
+        # Частоту запросов ограничивает сам analyzer (EventAnalyzer.rate_limiter): лимит общий
+        # для всех территорий и заданий демона, а не новый на каждый этап
+        self.analyzer = analyzer
+        self.workers = workers
+        self.batch_size = batch_size
+        self.min_quality = min_quality
+        self.analyzed = 0
+
+    def analyze_batch(self, events):
+        """Пачка в модель (в потоке пула); профиль — здесь, а не в ждущем потоке"""
+        with metrics.profile('filter.ai'):
+            return self.analyzer.analyze_many(events, self.batch_size)
+
+    def qualifies(self, analysis):
+        """Проходит ли событие фильтр"""
+        if analysis.get('has_bad_content'):
+            return False
+        return analysis.get('quality', 0) >= self.min_quality
+
+    def run(self, events, max_count=None, prefilter=None):
+        """Вернуть [(событие, анализ)] прошедших фильтр, в исходном порядке.
+
+        Если задан prefilter (ai.prefilter.Prefilter), события сначала решаются
+        локально, а в модель уходят только неоднозначные. Пачки анализируются
+        параллельно, но результаты разбираются строго по порядку, поэтому итог
+        совпадает с последовательным проходом. Как только набрано max_count
+        подходящих событий, новые пачки не отправляются.
+        """
+        if prefilter is not None:
+            with metrics.profile('filter.prefilter'):
+                decisions = [prefilter.classify(event) for event in events]
+        else:
+            decisions = [(ASK_LLM, None)] * len(events)
+
+        # Пачки только из событий, которые нужно спросить у модели
+        llm_indexes = [i for i, (decision, _) in enumerate(decisions) if decision == ASK_LLM]
+        batches = [llm_indexes[i:i + self.batch_size] for i in range(0, len(llm_indexes), self.batch_size)]
+        batch_of = {}
+        for batch_num, batch in enumerate(batches):
+            for pos, i in enumerate(batch):
+                batch_of[i] = (batch_num, pos)
+
+        accepted = []
+        futures = {}
+        results = {}
+        self.analyzed = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        def submit_upto(last):
+            for batch_num in range(len(futures), min(last + 1, len(batches))):
+                batch_events = [events[i] for i in batches[batch_num]]
+                futures[batch_num] = executor.submit(self.analyze_batch, batch_events)
+
+        try:
+            submit_upto(self.workers - 1)
+
+            for i, (decision, analysis) in enumerate(decisions):
+                if decision == REJECT:
+                    continue
+
+                if decision == ASK_LLM:
+                    batch_num, pos = batch_of[i]
+                    if batch_num not in results:
+                        # Держим в работе не больше workers пачек впереди текущей
+                        submit_upto(batch_num + self.workers - 1)
+                        results[batch_num] = futures[batch_num].result()
+                        results.pop(batch_num - 1, None)
+                    analysis = results[batch_num][pos]
+                    self.analyzed += 1
+                    if not self.qualifies(analysis):
+                        continue
+
+                accepted.append((events[i], analysis))
+                if max_count and len(accepted) >= max_count:
+                    logger.info(f"[AI] Набрано {max_count} событий, остальные не анализируем")
+                    break
+        finally:
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return accepted
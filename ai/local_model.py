@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Локальная модель качества: хэшированные признаки + логистическая регрессия
+Обучается офлайн на вердиктах модели из кэша (data/analysis_cache.py), выдаёт
+откалиброванную уверенность. Мат и запрещённый контент модель не видит, поэтому
+сама она только отсеивает: уверенный отказ — без LLM, всё остальное проверяет LLM
+
+Обучение (из корня проекта):
+  python -m ai.local_model --cache data/cache/analysis.sqlite3 --out data/cache/quality_model.json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+HASH_BITS = 18
+_MASK = (1 << HASH_BITS) - 1
+_WORD_RE = re.compile(r'\w+')
+# Описание длинное — хватает начала
+MAX_DESCRIPTION_WORDS = 150
+
+
+def event_fields(event):
+    """Поля события, из которых строятся признаки (те же, что ключ кэша вердиктов)"""
+    return {
+        'title': event.title,
+        'description': event.description,
+        'date': event.date,
+        'place': event.place,
+        'price_text': event.price_text,
+    }
+
+
+def _words(text):
+    return _WORD_RE.findall((text or '').lower().replace('ё', 'е'))
+
+
+def features(fields):
+    """Разреженный вектор {индекс: значение}; индекс — crc32 имени признака"""
+    vector = {}
+
+    def add(name, value=1.0):
+        index = zlib.crc32(name.encode('utf-8')) & _MASK
+        vector[index] = vector.get(index, 0.0) + value
+
+    add('bias')
+    title = _words(fields.get('title'))
+    for word in title:
+        add('t:' + word)
+    for left, right in zip(title, title[1:]):
+        add(f"tb:{left}_{right}")
+
+    description = _words(fields.get('description'))[:MAX_DESCRIPTION_WORDS]
+    if description:
+        # Длинное описание не должно перевешивать название
+        weight = 1.0 / math.sqrt(len(description))
+        for word in description:
+            add('d:' + word, weight)
+    add(f"dl:{min(len(fields.get('description') or '') // 100, 10)}")
+
+    place = (fields.get('place') or '').lower()
+    add('p:' + place if place else 'p:-')
+    price = (fields.get('price_text') or '').lower()
+    add('price:free' if 'бесплат' in price else 'price:yes' if price else 'price:-')
+    add('date:yes' if fields.get('date') else 'date:-')
+    return vector
+
+
+def _sigmoid(z):
+    if z < -35:
+        return 0.0
+    if z > 35:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class QualityModel:
+    """P(событие проходит фильтр) и оценка качества 0-10 по хэшированным признакам"""
+
+    def __init__(self, weights=None, quality_weights=None, calibration=(1.0, 0.0), threshold=5, report=None):
+        # Веса хранятся разреженно: ненулевых — десятки тысяч из 2^HASH_BITS
+        self.weights = weights or {}
+        self.quality_weights = quality_weights or {}
+        # Платт: p = sigmoid(a * z + b) на отложенной выборке
+        self.calibration = calibration
+        self.threshold = threshold
+        self.report = report or {}
+
+    def score(self, vector):
+        """Откалиброванная вероятность «подходит» и оценка качества"""
+        weights, quality_weights = self.weights, self.quality_weights
+        z = 0.0
+        quality = 0.0
+        for index, value in vector.items():
+            z += weights.get(index, 0.0) * value
+            quality += quality_weights.get(index, 0.0) * value
+        a, b = self.calibration
+        return _sigmoid(a * z + b), quality
+
+    def predict_many(self, events):
+        """[(вероятность, оценка качества)] для пачки событий"""
+        return [self.score(features(event_fields(event))) for event in events]
+
+    def is_sure_reject(self, probability, confidence):
+        """Уверенный отказ — единственное решение, которое модель принимает без LLM"""
+        return 1 - probability >= confidence
+
+    def analysis(self, event, probability, quality):
+        """Вердикт в формате EventAnalyzer; оценка согласована с решением модели"""
+        passes = probability >= 0.5
+        quality = int(round(min(max(quality, 0), 10)))
+        quality = max(quality, self.threshold) if passes else min(quality, self.threshold - 1)
+        return {
+            "quality": quality,
+            "has_bad_content": False,
+            "event_date": event.date or 'не указано',
+            "event_location": event.place or 'не указано',
+            "summary": event.description[:100],
+            "is_relevant": passes,
+            "confidence": round(max(probability, 1 - probability), 3),
+            "source": "local",
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        data = {
+            'version': MODEL_VERSION,
+            'hash_bits': HASH_BITS,
+            'threshold': self.threshold,
+            'calibration': list(self.calibration),
+            'report': self.report,
+            'weights': {str(k): round(v, 6) for k, v in self.weights.items() if abs(v) > 1e-6},
+            'quality_weights': {str(k): round(v, 6) for k, v in self.quality_weights.items() if abs(v) > 1e-6},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Модель из файла или None (нет файла или другая версия признаков)"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != MODEL_VERSION or data.get('hash_bits') != HASH_BITS:
+            logger.warning(f"[LocalModel] {path}: другая версия признаков, переобучите модель")
+            return None
+        return cls(
+            weights={int(k): v for k, v in data['weights'].items()},
+            quality_weights={int(k): v for k, v in data['quality_weights'].items()},
+            calibration=tuple(data['calibration']),
+            threshold=data['threshold'],
+            report=data.get('report'),
+        )
+
+
+def _quality(verdict):
+    """Оценка качества из вердикта или None: одиночные вердикты кэшируются без проверки"""
+    if not isinstance(verdict, dict):
+        return None
+    quality = verdict.get('quality', 0)
+    if isinstance(quality, bool):
+        return None
+    try:
+        quality = float(quality)
+    except (TypeError, ValueError):
+        return None
+    return quality if 0 <= quality <= 10 else None
+
+
+def _is_good(verdict, quality, threshold):
+    return not verdict.get('has_bad_content') and quality >= threshold
+
+
+def train(rows, threshold=5, epochs=5, l2=1e-6, holdout=0.2, confidence=0.9):
+    """Обучить модель на [(поля события, вердикт LLM)].
+
+    Логистическая регрессия и линейная оценка качества учатся AdaGrad по
+    разреженным признакам; калибровка Платта и отчёт — на отложенной части
+    (по хэшу названия, чтобы одно событие не попало в обе части).
+    """
+    train_set, test_set = [], []
+    skipped = 0
+    for fields, verdict in rows:
+        quality = _quality(verdict)
+        if quality is None:
+            skipped += 1
+            continue
+        sample = (features(fields), 1.0 if _is_good(verdict, quality, threshold) else 0.0, quality)
+        bucket = zlib.crc32((fields.get('title') or '').encode('utf-8')) % 100
+        (test_set if bucket < holdout * 100 else train_set).append(sample)
+    if skipped:
+        logger.warning(f"[LocalModel] Пропущено вердиктов без числовой оценки качества: {skipped}")
+    if not train_set or not test_set:
+        raise ValueError(f"Мало данных для обучения: {len(train_set)} / {len(test_set)}")
+
+    weights, quality_weights = {}, {}
+    squares, quality_squares = {}, {}
+    rate, quality_rate = 0.5, 0.2
+    for epoch in range(epochs):
+        # Детерминированное перемешивание между эпохами
+        order = sorted(range(len(train_set)), key=lambda i: zlib.crc32(f"{epoch}:{i}".encode()))
+        for i in order:
+            vector, label, quality = train_set[i]
+            z = sum(weights.get(k, 0.0) * v for k, v in vector.items())
+            q = sum(quality_weights.get(k, 0.0) * v for k, v in vector.items())
+            error = _sigmoid(z) - label
+            quality_error = (q - quality) / 10
+            for k, v in vector.items():
+                g = error * v + l2 * weights.get(k, 0.0)
+                squares[k] = squares.get(k, 0.0) + g * g
+                weights[k] = weights.get(k, 0.0) - rate * g / math.sqrt(squares[k] + 1e-8)
+                g = quality_error * v
+                quality_squares[k] = quality_squares.get(k, 0.0) + g * g
+                quality_weights[k] = quality_weights.get(k, 0.0) - quality_rate * g / math.sqrt(quality_squares[k] + 1e-8)
+
+    model = QualityModel(weights, quality_weights, threshold=threshold)
+    logits = [sum(weights.get(k, 0.0) * v for k, v in vector.items()) for vector, _, _ in test_set]
+    labels = [label for _, label, _ in test_set]
+    model.calibration = _platt(logits, labels)
+    model.report = _evaluate(model, test_set, confidence)
+    model.report.update(train_size=len(train_set), trained_at=int(time.time()))
+    return model
+
+
+def _platt(logits, labels, iterations=300, rate=0.1):
+    """Параметры a, b калибровки sigmoid(a * z + b) (градиентный спуск по log loss)"""
+    a, b = 1.0, 0.0
+    n = len(logits)
+    for _ in range(iterations):
+        grad_a = grad_b = 0.0
+        for z, y in zip(logits, labels):
+            error = _sigmoid(a * z + b) - y
+            grad_a += error * z
+            grad_b += error
+        a -= rate * grad_a / n
+        b -= rate * grad_b / n
+    return a, b
+
+
+def _evaluate(model, test_set, confidence):
+    """Точность, Brier и доля событий, отсеиваемых без LLM при пороге уверенности"""
+    correct = brier = sure = sure_correct = 0
+    quality_error = 0.0
+    for vector, label, quality in test_set:
+        probability, estimate = model.score(vector)
+        hit = (probability >= 0.5) == bool(label)
+        correct += hit
+        brier += (probability - label) ** 2
+        quality_error += abs(estimate - quality)
+        if model.is_sure_reject(probability, confidence):
+            sure += 1
+            sure_correct += hit
+    n = len(test_set)
+    return {
+        'test_size': n,
+        'accuracy': round(correct / n, 4),
+        'brier': round(brier / n, 4),
+        'quality_mae': round(quality_error / n, 3),
+        'confidence': confidence,
+        'local_share': round(sure / n, 4),
+        'local_accuracy': round(sure_correct / sure, 4) if sure else None,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Обучение локальной модели качества на кэше вердиктов")
+    parser.add_argument('--cache', default='data/cache/analysis.sqlite3', help="кэш вердиктов (data/analysis_cache.py)")
+    parser.add_argument('--ttl', type=int, default=7 * 24 * 3600,
+                        help="возраст вердиктов для обучения (сек), как ai.cache.ttl; кэш при этом не чистится")
+    parser.add_argument('--out', default='data/cache/quality_model.json')
+    parser.add_argument('--min-quality', type=int, default=5,
+                        help="порог качества, как ai.min_quality (сохраняется в модели и сверяется при запуске)")
+    parser.add_argument('--confidence', type=float, default=0.9, help="порог уверенности для отчёта")
+    parser.add_argument('--epochs', type=int, default=5)
+    return parser.parse_args()
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from ai.event_analyzer import BATCH_PROMPT_VERSION, MODEL, PROMPT_VERSION
+    from data.analysis_cache import AnalysisCache
+
+    args = parse_args()
+    # Только чтение: чистка по TTL удалила бы вердикты, если в ai.cache.ttl срок длиннее
+    cache = AnalysisCache(args.cache, ttl=args.ttl, prune=False)
+    try:
+        # Вердикты старой модели или старого промпта учат не тому, что сейчас решает LLM
+        rows = list(cache.training_rows(MODEL, (PROMPT_VERSION, BATCH_PROMPT_VERSION)))
+    finally:
+        cache.close()
+    print(f"Вердиктов {MODEL} в кэше: {len(rows)}")
+
+    model = train(rows, threshold=args.min_quality, epochs=args.epochs, confidence=args.confidence)
+    model.save(args.out)
+    report = model.report
+    print(f"Точность {report['accuracy']:.1%}, Brier {report['brier']:.3f}, ошибка оценки {report['quality_mae']:.2f}")
+    print(f"Уверенный отказ ≥ {args.confidence}: {report['local_share']:.1%} событий без LLM, "
+          f"точность на них {report['local_accuracy'] or 0:.1%}")
+    print(f"Модель сохранена: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
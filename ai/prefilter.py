@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Локальный предфильтр перед AI: правила и эвристическая оценка
+Явный мусор и явно хорошие события решаются на месте, в модель идёт только середина
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Решения предфильтра
+REJECT = 'reject'
+ACCEPT = 'accept'
+ASK_LLM = 'llm'
+
+DEFAULT_BAD_WORDS = ['взрослый контент', '18+ только для взрослых', 'эротическ', 'стриптиз']
+# Максимум эвристической оценки (score): полная карточка KudaGo набирает его почти всегда
+MAX_SCORE = 10
+
+
+class Prefilter:
+    def __init__(self, settings=None, collection=None, window=None):
+        settings = settings or {}
+        # Оценка 0-10: ниже reject_below — отбрасываем, от accept_from — берём без AI.
+        # По умолчанию принятие без AI выключено: мат и незаконный контент видит только модель
+        self.reject_below = settings.get('reject_below', 3)
+        self.accept_from = settings.get('accept_from', MAX_SCORE + 1)
+        self.min_description = settings.get('min_description', 40)
+        bad_words = settings.get('bad_words', DEFAULT_BAD_WORDS)
+        self.bad_words_re = re.compile('|'.join(re.escape(w) for w in bad_words), re.I) if bad_words else None
+
+        collection = collection or {}
+        self.is_free = collection.get('is_free')
+        self.max_price = collection.get('max_price')
+        # (начало, конец) периода в unix-времени или None
+        self.window = window
+
+        self.stats = {'rules': 0, 'local_reject': 0, 'local_accept': 0, 'llm': 0}
+
+    def classify(self, event):
+        """Решение по событию: (REJECT | ACCEPT | ASK_LLM, анализ для ACCEPT или причина)"""
+        reason = self._rule_violation(event)
+        if reason:
+            self.stats['rules'] += 1
+            return REJECT, reason
+
+        score = self.score(event)
+        if score < self.reject_below:
+            self.stats['local_reject'] += 1
+            return REJECT, f"низкая оценка {score}"
+
+        if score >= self.accept_from:
+            self.stats['local_accept'] += 1
+            return ACCEPT, {
+                "quality": score,
+                "has_bad_content": False,
+                "event_date": event.date or 'не указано',
+                "event_location": event.place or 'не указано',
+                "summary": event.description[:100],
+                "is_relevant": True
+            }
+
+        self.stats['llm'] += 1
+        return ASK_LLM, None
+
+    def _rule_violation(self, event):
+        """Жёсткие правила: причина отказа или None"""
+        title = event.title.strip()
+        if not title:
+            return "нет названия"
+
+        if self.bad_words_re and self.bad_words_re.search(f"{title} {event.description}"):
+            return "запрещённые слова"
+
+        # У Яндекса и площадок дата события неизвестна — их период не проверяем
+        if self.window and event.start is not None:
+            start, end = self.window
+            if not start <= event.start <= end:
+                return "вне периода"
+
+        return self._price_violation(event)
+
+    def _price_violation(self, event):
+        """Условия подборки по цене (is_free / max_price)"""
+        price_min = event.price_min
+        if price_min is not None:
+            if self.is_free and price_min > 0:
+                return "платное в бесплатной подборке"
+            if self.max_price is not None and price_min > self.max_price:
+                return f"дороже {self.max_price}₽"
+
+        return None
+
+    def score(self, event):
+        """Эвристическая оценка полноты и качества карточки (0-10)"""
+        score = 0
+        title = event.title.strip()
+        description = event.description.strip()
+
+        if 10 <= len(title) <= 120:
+            score += 2
+        elif title:
+            score += 1
+        if len(description) >= self.min_description:
+            score += 3
+        elif description:
+            score += 1
+        if event.place:
+            score += 2
+        if event.price_min is not None:
+            score += 1
+        if event.url:
+            score += 1
+        if event.start is not None:
+            score += 1
+
+        return min(score, MAX_SCORE)
+
+    def report(self):
+        total = sum(self.stats.values())
+        return (f"правила отсеяли {self.stats['rules']}, эвристика отсеяла {self.stats['local_reject']}, "
+                f"приняла {self.stats['local_accept']}, в AI {self.stats['llm']} из {total}")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Token bucket для ограничения частоты запросов к модели (потокобезопасный)
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=20, burst=None):
+        # rate_per_minute — устойчивая скорость, burst — сколько запросов можно сделать разом
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(rate_per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Забрать токен, при необходимости подождав его появления"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
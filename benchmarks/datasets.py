@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Синтетические наборы событий в формате ответа KudaGo API
+Детерминированы (seed), чтобы прогоны можно было сравнивать между собой
+"""
+
+import random
+import time
+
+_GENRES = ['Концерт', 'Спектакль', 'Выставка', 'Лекция', 'Мастер-класс', 'Фестиваль', 'Стендап', 'Экскурсия']
+_WORDS = ['джаз', 'весна', 'город', 'ночь', 'история', 'свет', 'музыка', 'импрессионисты', 'Чехов',
+          'авангард', 'кино', 'река', 'модерн', 'дети', 'наука', 'космос', 'поэзия', 'барокко']
+_PLACES = [
+    ('Зал Чайковского', 55.7700, 37.5950), ('Дом культуры ГЭС-2', 55.7430, 37.6120),
+    ('Парк Горького', 55.7298, 37.6010), ('Гоголь-центр', 55.7590, 37.6600),
+    ('Музей Москвы', 55.7360, 37.5940), ('Клуб 16 тонн', 55.7660, 37.5670), ('ЦДХ', 55.7350, 37.6060),
+    ('Планетарий', 55.7610, 37.5840), ('Библиотека им. Некрасова', 55.7730, 37.6830),
+    ('Театр Маяковского', 55.7570, 37.5930),
+]
+_PRICES = ['', 'бесплатно', 'от 300 до 800 рублей', '500 рублей', 'от 1500 рублей', '2000–5000 ₽', '16+ 700 руб']
+
+
+def kudago_events(size, seed=0, now=None):
+    """size событий, отсортированных по -publication_date (как отдаёт API)"""
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    events = []
+
+    for i in range(size):
+        title = f"{rng.choice(_GENRES)} «{rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)}»"
+        if rng.random() < 0.05:
+            # Одно и то же событие под чуть другим названием — работа для дедупликации
+            title = events[rng.randrange(len(events))]['title'] + ' (премьера)' if events else title
+        description = ' '.join(rng.choice(_WORDS) for _ in range(rng.choice([2, 8, 20, 40])))
+        price = rng.choice(_PRICES)
+        start = now + rng.randint(3600, 6 * 86400)
+        place, lat, lon = rng.choice(_PLACES)
+
+        events.append({
+            'id': 100000 + i,
+            'publication_date': now - i * 60,
+            'title': title,
+            'description': f"<p>{description}</p>",
+            'place': {'title': place, 'coords': {'lat': lat, 'lon': lon}},
+            'dates': [{'start': start, 'end': start + 7200}],
+            'price': price,
+            'is_free': price == 'бесплатно',
+            'site_url': f"https://kudago.com/msk/event/bench-{i}/",
+            'images': [{'image': f"https://kudago.com/media/images/event/bench-{i % 500}.jpg"}],
+        })
+
+    return events
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полного конвейера main.py без сети
+
+Запуск (из корня проекта):
+  python -m benchmarks.run                          — наборы 100, 10k и 100k событий
+  python -m benchmarks.run --sizes 100,10000 --ai-latency 0.05 --ai-429 0.1 --json out.json
+  python -m benchmarks.run --stream                 — то же для потокового конвейера (pipeline.py)
+
+Заглушки API работают в этом процессе, а конвейер — в отдельном дочернем,
+чтобы пиковая память каждого прогона мерилась отдельно.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.datasets import kudago_events
+from benchmarks.stubs import StubBehavior, StubServer
+
+# Этапы, по которым печатаются p50/p99
+REPORT_TIMERS = ('scrape.kudago', 'dedup', 'ai.call', 'filter', 'pipeline', 'format', 'send')
+
+
+def bench_config(endpoints, workdir, stream=False):
+    """Конфиг прогона: только KudaGo, кэши и хранилище во временной папке, лимиты сняты"""
+    return {
+        'pipeline': {'streaming': stream},
+        'endpoints': endpoints,
+        'http': {'pool_connections': 4, 'pool_maxsize': 16, 'max_retries': 3, 'backoff_factor': 0.01},
+        'scraper': {'max_workers': 4, 'deadline': 3600, 'paginate': True, 'kudago_prefetch': 4},
+        'sources': {'kudago': {'timeout': 3600, 'failure_threshold': 1000}},
+        'store': {'enabled': True, 'path': os.path.join(workdir, 'events.sqlite3')},
+        'ai': {
+            'workers': 8,
+            'batch_size': 10,
+            'requests_per_minute': 1000000,
+            'min_quality': 5,
+            'prefilter': {'enabled': True},
+            'cache': {'enabled': True, 'path': os.path.join(workdir, 'analysis.sqlite3')},
+        },
+        # Картинки заглушки не отдают — замеряется текстовая публикация
+        'telegram': {'send': {'global_per_second': 1000, 'chat_per_minute': 60000, 'chat_burst': 100},
+                     'media': {'enabled': False}},
+        'territories': {'bench': {'name': 'Москва', 'thread_id': 1}},
+        'collections': {
+            'free_week': {'name': 'Бесплатно на неделе', 'is_free': True, 'max_count': 50},
+            'cheap_week': {'name': 'До 1000₽ на неделе', 'is_free': False, 'max_price': 1000, 'max_count': 30},
+        },
+    }
+
+
+def run_child(args):
+    """Один прогон main.run_batch против заглушек; результат — JSON в stdout"""
+    import main
+    from logs.metrics import metrics
+
+    logging.getLogger().setLevel(logging.WARNING)
+    metrics.path = os.path.join(args.workdir, 'metrics.jsonl')
+    config = bench_config(json.loads(args.endpoints), args.workdir, args.stream)
+
+    started = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.run_batch(config, ['bench'], list(config['collections']), 'week', 'BENCH', '-100', 'bench-key')
+    elapsed = time.time() - started
+
+    with open(metrics.path, encoding='utf-8') as f:
+        record = json.loads(f.readlines()[-1])
+    print(json.dumps({
+        'started': started,
+        'elapsed': elapsed,
+        # ru_maxrss на Linux — в килобайтах
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'counters': record['counters'],
+        'timers': record['timers'],
+    }))
+
+
+def run_size(size, behavior, seed, stream=False):
+    events = kudago_events(size, seed=seed)
+    stub = StubServer(events, behavior).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.run', '--child',
+                 '--workdir', workdir, '--endpoints', json.dumps(stub.endpoints)]
+                + (['--stream'] if stream else []),
+                cwd=ROOT, capture_output=True, text=True
+            )
+        if child.returncode != 0:
+            raise RuntimeError(f"прогон {size} упал:\n{child.stderr[-2000:]}")
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+    finally:
+        stub.stop()
+
+    first_post = min(stub.sent_at) - result['started'] if stub.sent_at else None
+    return {
+        'size': size,
+        'elapsed': round(result['elapsed'], 3),
+        'throughput': round(size / result['elapsed'], 1),
+        'first_post': round(first_post, 3) if first_post is not None else None,
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+        'stub': stub.stats,
+        'counters': result['counters'],
+        'timers': {name: result['timers'][name] for name in REPORT_TIMERS if name in result['timers']},
+    }
+
+
+def print_report(results):
+    print(f"{'событий':>8} {'время, с':>9} {'соб/с':>9} {'1-й пост':>9} {'RSS, МБ':>8} {'AI':>6} {'TG':>4} {'429':>5}")
+    for r in results:
+        stub = r['stub']
+        first_post = f"{r['first_post']:.2f}" if r['first_post'] is not None else '—'
+        print(f"{r['size']:>8} {r['elapsed']:>9.2f} {r['throughput']:>9.1f} {first_post:>9} "
+              f"{r['peak_rss_mb']:>8.1f} {stub['ai_calls']:>6} {stub['tg_messages']:>4} "
+              f"{stub['ai_429'] + stub['tg_429']:>5}")
+        for name, t in r['timers'].items():
+            print(f"{'':>8} {name:<14} n={t['count']:<6} p50={t['p50'] * 1000:.1f}мс p99={t['p99'] * 1000:.1f}мс")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера на локальных заглушках")
+    parser.add_argument('--sizes', default='100,10000,100000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ai-latency', type=float, default=0.02, help="задержка ответа модели (сек)")
+    parser.add_argument('--ai-429', type=float, default=0.0, help="доля ответов 429 от модели")
+    parser.add_argument('--tg-latency', type=float, default=0.01)
+    parser.add_argument('--tg-429', type=float, default=0.0)
+    parser.add_argument('--stream', action='store_true', help="потоковый конвейер вместо пакетного")
+    parser.add_argument('--json', help="сохранить результаты в файл")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--endpoints', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        return run_child(args)
+
+    behavior = StubBehavior(args.ai_latency, args.ai_429, args.tg_latency, args.tg_429, seed=args.seed)
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f"⏱  {size} событий...", flush=True)
+        results.append(run_size(size, behavior, args.seed, args.stream))
+
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Локальные заглушки внешних API для бенчмарков (без сети)
+KudaGo /events/, OpenRouter chat/completions и Telegram sendMessage
+на одном HTTP сервере: /kudago/..., /openrouter/..., /telegram/...
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+_BATCH_ID_RE = re.compile(r'\[id=(\d+)\]\nНазвание: (.*)')
+
+
+class StubBehavior:
+    """Задержки и доля ответов 429 для заглушек AI и Telegram"""
+
+    def __init__(self, ai_latency=0.02, ai_429=0.0, tg_latency=0.01, tg_429=0.0, seed=0):
+        self.ai_latency = ai_latency
+        self.ai_429 = ai_429
+        self.tg_latency = tg_latency
+        self.tg_429 = tg_429
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def throttled(self, share):
+        with self._lock:
+            return self.rng.random() < share
+
+
+def _quality(title):
+    # Стабильная «оценка модели» по названию
+    return zlib.crc32(title.encode('utf-8')) % 11
+
+
+class StubServer:
+    def __init__(self, events, behavior=None, host='127.0.0.1', port=0):
+        self.events = events
+        self.behavior = behavior or StubBehavior()
+        self.stats = {'kudago_pages': 0, 'ai_calls': 0, 'ai_429': 0, 'tg_messages': 0, 'tg_429': 0}
+        self.sent_at = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.startswith('/kudago/'):
+                    return self._json(200, stub.kudago_page(url, self.headers.get('Host')))
+                self._json(404, {'detail': 'not found'})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                path = urlsplit(self.path).path
+                if path.startswith('/openrouter/'):
+                    return self._json(*stub.completion(body))
+                if path.startswith('/telegram/') and path.endswith('/sendMessage'):
+                    return self._json(*stub.send_message(body))
+                self._json(404, {'ok': False})
+
+            def _json(self, status, payload, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name='bench-stubs', daemon=True)
+
+    @property
+    def endpoints(self):
+        return {
+            'kudago': f"{self.base_url}/kudago/public-api/v1.4/events/",
+            'openrouter': f"{self.base_url}/openrouter/api/v1/chat/completions",
+            'telegram': f"{self.base_url}/telegram",
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def kudago_page(self, url, host):
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        page = int(query.get('page', 1))
+        page_size = int(query.get('page_size', 20))
+        results = self.events[(page - 1) * page_size:page * page_size]
+        self._count('kudago_pages')
+
+        next_url = None
+        if page * page_size < len(self.events):
+            next_url = f"http://{host}{url.path}?{urlencode({**query, 'page': page + 1})}"
+        return {'count': len(self.events), 'next': next_url, 'previous': None, 'results': results}
+
+    def completion(self, body):
+        behavior = self.behavior
+        time.sleep(behavior.ai_latency)
+        if behavior.throttled(behavior.ai_429):
+            self._count('ai_429')
+            return 429, {'error': {'message': 'Rate limit exceeded'}}, {'Retry-After': '0'}
+        self._count('ai_calls')
+
+        prompt = body['messages'][0]['content']
+        items = _BATCH_ID_RE.findall(prompt)
+        if items:
+            answer = [self._verdict(title, int(item_id)) for item_id, title in items]
+        else:
+            title = re.search(r'Название: (.*)', prompt).group(1)
+            answer = self._verdict(title)
+        content = json.dumps(answer, ensure_ascii=False)
+        return 200, {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+
+    @staticmethod
+    def _verdict(title, item_id=None):
+        quality = _quality(title)
+        verdict = {
+            'quality': quality,
+            'has_bad_content': False,
+            'event_date': 'не указано',
+            'event_location': 'не указано',
+            'summary': title[:100],
+            'is_relevant': quality >= 5,
+        }
+        if item_id is not None:
+            verdict['id'] = item_id
+        return verdict
+
+    def send_message(self, body):
+        behavior = self.behavior
+        time.sleep(behavior.tg_latency)
+        if behavior.throttled(behavior.tg_429):
+            self._count('tg_429')
+            return 429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 0}}
+        self._count('tg_messages')
+        with self._lock:
+            self.sent_at.append(time.time())
+            message_id = len(self.sent_at)
+        return 200, {'ok': True, 'result': {'message_id': message_id, 'message_thread_id': body.get('message_thread_id')}}
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Постоянная работа агрегатора: расписание обновления тем группы
+Каждая пара территория/подборка обновляется со своим интервалом,
+территории стартуют со сдвигом, остановка — после текущего задания
+"""
+
+import heapq
+import signal
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class Job:
+    next_run: float
+    # При равном времени — порядок тем из config.yaml
+    order: int
+    territory: str = field(compare=False)
+    collection: str = field(compare=False)
+    interval: float = field(compare=False)
+    period: str = field(compare=False)
+
+
+def build_jobs(config, settings, now=None):
+    """Задания для всех тем группы с интервалами из секции daemon"""
+    now = time.time() if now is None else now
+    default_interval = settings.get('interval', 3600)
+    stagger = settings.get('stagger', 30)
+    period = settings.get('period', 'week')
+    # Переопределения: ключ подборки, территории или "территория/подборка"
+    intervals = settings.get('intervals') or {}
+    periods = settings.get('periods') or {}
+
+    jobs = []
+    for i, terr_key in enumerate(config['territories']):
+        start = now + i * stagger
+        for col_key in config['collections']:
+            pair = f"{terr_key}/{col_key}"
+            interval = intervals.get(pair, intervals.get(col_key, intervals.get(terr_key, default_interval)))
+            job_period = periods.get(pair, periods.get(col_key, periods.get(terr_key, period)))
+            jobs.append(Job(start, len(jobs), terr_key, col_key, interval, job_period))
+    return jobs
+
+
+class Daemon:
+    def __init__(self, jobs, run_job):
+        # run_job(territories, collections, period) — один проход publish()
+        self.run_job = run_job
+        self.queue = list(jobs)
+        heapq.heapify(self.queue)
+        self.stopping = threading.Event()
+
+    def install_signal_handlers(self):
+        def handle(signum, frame):
+            logger.info("[Daemon] Остановка после текущего задания (повторный сигнал — сразу)")
+            self.stopping.set()
+            # Второй Ctrl+C прерывает без ожидания
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        logger.info(f"[Daemon] Запущен: {len(self.queue)} заданий")
+        while self.queue and not self.stopping.is_set():
+            delay = self.queue[0].next_run - time.time()
+            if delay > 0 and self.stopping.wait(delay):
+                break
+
+            for (terr_key, period), cols in self._due().items():
+                if self.stopping.is_set():
+                    break
+                started = time.monotonic()
+                try:
+                    # Территория собирается один раз для всех подборок, которым пора обновиться
+                    self.run_job([terr_key], cols, period)
+                except Exception as e:
+                    logger.exception(f"[Daemon] {terr_key}: задание упало: {e}")
+                logger.info(f"[Daemon] {terr_key} ({', '.join(cols)}): {time.monotonic() - started:.1f}с")
+
+        logger.info("[Daemon] Остановлен")
+
+    def _due(self):
+        """Снять с очереди все наступившие задания и сразу запланировать следующие"""
+        now = time.time()
+        due = {}
+        while self.queue and self.queue[0].next_run <= now:
+            job = heapq.heappop(self.queue)
+            due.setdefault((job.territory, job.period), []).append(job.collection)
+            # Пропущенные запуски (долгое задание, сон машины) не догоняем
+            while job.next_run <= now:
+                job.next_run += job.interval
+            heapq.heappush(self.queue, job)
+
+        if self.queue:
+            upcoming = datetime.fromtimestamp(self.queue[0].next_run).strftime('%H:%M:%S')
+            logger.debug(f"[Daemon] Следующее задание в {upcoming}")
+        return due
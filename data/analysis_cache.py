@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Кэш AI вердиктов по содержимому события
+Ключ — хэш полей события + модель + версия промпта; TTL + LRU + счётчики
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Поля события (processor.event.Event), от которых зависит вердикт модели
+KEY_FIELDS = ('title', 'description', 'date', 'place', 'price_text')
+
+
+class AnalysisCache:
+    # Время чтения сохраняется пачкой: при записи вердиктов или раз в FLUSH_INTERVAL секунд
+    FLUSH_INTERVAL = 60
+
+    def __init__(self, path='data/cache/analysis.sqlite3', ttl=7 * 24 * 3600, max_entries=50000, prune=True):
+        # prune=False — не удалять устаревшее при открытии (обучение ai.local_model со своим ttl)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # Горячая копия в памяти: попадание — это поиск в словаре, без похода в SQLite
+        self._entries = OrderedDict()
+        self._touched = set()
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_accessed ON verdicts(accessed_at)")
+        if prune:
+            self._db.execute("DELETE FROM verdicts WHERE stored_at < ?", (time.time() - ttl,))
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT key, verdict, stored_at FROM verdicts ORDER BY accessed_at DESC LIMIT ?",
+            (max_entries,)
+        ).fetchall()
+        for key, verdict, stored_at in reversed(rows):
+            self._entries[key] = (json.loads(verdict), stored_at)
+
+    @staticmethod
+    def make_key(event, model, prompt_version):
+        """Стабильный хэш содержимого события"""
+        fields = [str(getattr(event, name) or '').strip() for name in KEY_FIELDS]
+        raw = json.dumps([model, prompt_version] + fields, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.count('ai.cache.miss')
+                return None
+
+            verdict, stored_at = entry
+            if time.time() - stored_at >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                metrics.count('ai.cache.miss')
+                return None
+
+            self._entries.move_to_end(key)
+            self._touched.add(key)
+            self.hits += 1
+            metrics.count('ai.cache.hit')
+            # В режиме демона close() не вызывается часами — порядок LRU сохраняем по ходу
+            if time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL:
+                self._flush()
+                self._db.commit()
+            return dict(verdict)
+
+    def put(self, key, event, verdict, model, prompt_version):
+        now = time.time()
+        fields = {name: getattr(event, name) for name in KEY_FIELDS}
+
+        with self._lock:
+            self._entries[key] = (dict(verdict), now)
+            self._entries.move_to_end(key)
+            self._db.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, json.dumps(fields, ensure_ascii=False, default=str),
+                 json.dumps(verdict, ensure_ascii=False), now, now)
+            )
+
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._touched.discard(old_key)
+                self._db.execute("DELETE FROM verdicts WHERE key = ?", (old_key,))
+
+            self._touched.discard(key)
+            self._flush()
+            self._db.commit()
+
+    def flush(self):
+        """Сохранить время последнего чтения (порядок LRU) на диск"""
+        with self._lock:
+            self._flush()
+            self._db.commit()
+
+    def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._touched:
+            return
+        now = time.time()
+        self._db.executemany(
+            "UPDATE verdicts SET accessed_at = ? WHERE key = ?",
+            [(now, key) for key in self._touched]
+        )
+        self._touched.clear()
+
+    def training_rows(self, model, prompt_versions):
+        """[(поля события, вердикт)] живых записей модели model и версий промпта
+        prompt_versions — обучающая выборка ai.local_model"""
+        prompt_versions = tuple(prompt_versions)
+        placeholders = ', '.join('?' * len(prompt_versions))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT fields, verdict FROM verdicts WHERE stored_at >= ? AND model = ? "
+                f"AND prompt_version IN ({placeholders})",
+                (time.time() - self.ttl, model, *prompt_versions)
+            ).fetchall()
+        for fields, verdict in rows:
+            yield json.loads(fields), json.loads(verdict)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Хранилище уже виденных событий (SQLite)
+Что собрано, проанализировано и опубликовано — по территориям и темам группы
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from processor.event import Event
+
+logger = logging.getLogger(__name__)
+
+
+class EventStore:
+    def __init__(self, path='data/cache/events.sqlite3'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                uid TEXT NOT NULL,
+                territory TEXT NOT NULL,
+                start INTEGER,
+                published INTEGER,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                analyzed_at REAL,
+                quality INTEGER,
+                PRIMARY KEY (uid, territory)
+            );
+            CREATE INDEX IF NOT EXISTS events_start ON events(territory, start);
+
+            CREATE TABLE IF NOT EXISTS publications (
+                uid TEXT NOT NULL,
+                thread_id INTEGER NOT NULL,
+                territory TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                published_at REAL NOT NULL,
+                PRIMARY KEY (uid, thread_id)
+            );
+
+            CREATE TABLE IF NOT EXISTS watermarks (
+                territory TEXT NOT NULL,
+                source TEXT NOT NULL,
+                time_range TEXT NOT NULL,
+                published INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (territory, source, time_range)
+            );
+        """)
+        self._db.commit()
+
+    def watermark(self, territory, source, time_range, max_age=6 * 3600):
+        """Дата самой свежей публикации, которую уже собрали (None — собираем всё заново).
+
+        Окно периода сдвигается вместе со временем, поэтому слишком старая
+        отметка не используется: раз в max_age секунд делаем полный сбор.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT published, updated_at FROM watermarks WHERE territory = ? AND source = ? AND time_range = ?",
+                (territory, source, time_range)
+            ).fetchone()
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        return row[0]
+
+    def record_fetched(self, territory, events, time_range=None, full_fetch=True, complete=None):
+        """Сохранить собранные события и сдвинуть отметку инкрементального сбора.
+
+        complete — значения EventSource, сбор которых прошёл без ошибок и таймаутов
+        (scraper.sources.complete_sources): отметку двигаем только им, иначе окно
+        пропущенного так и не попадёт в следующие дельты. None — всем.
+        """
+        now = time.time()
+        newest = {}
+        with self._lock:
+            for event in events:
+                self._db.execute("""
+                    INSERT INTO events (uid, territory, start, published, payload, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (uid, territory) DO UPDATE SET
+                        start = excluded.start, published = excluded.published,
+                        payload = excluded.payload, fetched_at = excluded.fetched_at
+                """, (event.uid, territory, event.start, event.published,
+                      json.dumps(event.to_dict(), ensure_ascii=False), now))
+                if event.published:
+                    source = event.source.value
+                    newest[source] = max(newest.get(source, 0), event.published)
+
+            if time_range is not None:
+                for source, published in newest.items():
+                    if complete is not None and source not in complete:
+                        continue
+                    # После дельты отметку не обновляем по времени — иначе полный сбор не наступит
+                    self._db.execute("""
+                        INSERT INTO watermarks VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (territory, source, time_range) DO UPDATE SET
+                            published = MAX(published, excluded.published),
+                            updated_at = CASE WHEN ? THEN excluded.updated_at ELSE updated_at END
+                    """, (territory, source, time_range, published, now, full_fetch))
+            self._db.commit()
+
+    def pending(self, territory, start, end):
+        """Собранные ранее, но ещё не опубликованные события в окне [start, end]"""
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT payload FROM events e
+                WHERE territory = ? AND start BETWEEN ? AND ?
+                  AND NOT EXISTS (SELECT 1 FROM publications p WHERE p.uid = e.uid AND p.territory = e.territory)
+                ORDER BY start
+            """, (territory, int(start), int(end))).fetchall()
+        return [Event.from_dict(json.loads(payload)) for (payload,) in rows]
+
+    def unpublished(self, events, thread_id):
+        """Отбросить события, уже опубликованные в этой теме"""
+        if not events:
+            return []
+        published = self.published_uids(thread_id)
+        return [event for event in events if event.uid not in published]
+
+    def published_uids(self, thread_id):
+        """Все uid, уже опубликованные в теме (для потоковой проверки по одному)"""
+        with self._lock:
+            return {uid for (uid,) in self._db.execute("SELECT uid FROM publications WHERE thread_id = ?", (thread_id,))}
+
+    def record_analyzed(self, territory, events):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE events SET analyzed_at = ?, quality = ? WHERE uid = ? AND territory = ?",
+                [(now, event.quality, event.uid, territory) for event in events]
+            )
+            self._db.commit()
+
+    def mark_published(self, territory, thread_id, collection, events):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO publications VALUES (?, ?, ?, ?, ?)",
+                [(event.uid, thread_id, territory, collection, now) for event in events]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Дисковый HTTP кэш для источников событий (KudaGo, Яндекс.Афиша, сайты площадок)
+TTL + ревалидация по ETag/Last-Modified + LRU вытеснение по размеру
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, которые имеет смысл хранить вместе с телом
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class CachedResponse:
+    def __init__(self, url, status, headers, body, etag, last_modified, stored_at):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+    def to_response(self):
+        """Собрать requests.Response, неотличимый для вызывающего кода"""
+        response = Response()
+        response.status_code = self.status
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    # Время чтения пишется на диск пачками: не чаще раза в FLUSH_INTERVAL секунд или FLUSH_BATCH ключей
+    FLUSH_INTERVAL = 60
+    FLUSH_BATCH = 200
+
+    def __init__(self, path='data/cache/http.sqlite3', ttl=3600, max_mb=200):
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        # Прочитанные, но ещё не сохранённые ключи: key -> время чтения
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Ключ: URL + отсортированные параметры запроса"""
+        raw = url + '?' + json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Чтение не пишет на диск: время доступа копится и сохраняется пачкой
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.FLUSH_BATCH or time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL:
+                self._flush()
+                self._db.commit()
+
+        url, status, headers, body, etag, last_modified, stored_at = row
+        return CachedResponse(url, status, json.loads(headers), body, etag, last_modified, stored_at)
+
+    def put(self, key, response):
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        body = response.content
+        now = time.time()
+
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), body,
+                 headers.get('ETag'), headers.get('Last-Modified'), now, now, len(body))
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._touched.pop(key, None)
+            # Перед вытеснением порядок LRU на диске должен быть актуален
+            self._flush()
+            self._evict()
+            self._db.commit()
+
+    def touch(self, key):
+        """Ответ 304: запись снова свежая"""
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._db.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._flush()
+            self._db.commit()
+
+    def record(self, outcome):
+        """Учесть исход запроса: 'hits', 'misses' или 'revalidated'"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def flush(self):
+        """Сохранить накопленное время чтения (порядок LRU) на диск"""
+        with self._lock:
+            self._flush()
+            self._db.commit()
+
+    def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._touched:
+            return
+        self._db.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in self._touched.items()])
+        self._touched.clear()
+
+    def _evict(self):
+        """Вытесняем давно не читанные записи, пока не влезем в лимит"""
+        while self._size > self.max_bytes:
+            row = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._size = 0
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._size -= row[1]
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'size_mb': round(self._size / 1024 / 1024, 2),
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Кэш фото событий для Telegram (SQLite)
+Ссылка на картинку -> хэш содержимого -> file_id, выданный Telegram при загрузке:
+повторная публикация того же постера — просто ссылка на file_id, без скачивания
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    def __init__(self, path='data/cache/media.sqlite3', url_ttl=30 * 24 * 3600):
+        # Картинку по той же ссылке могут заменить — раз в url_ttl скачиваем заново
+        self.url_ttl = url_ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+
+            -- file_id действителен только для бота, который загрузил файл
+            CREATE TABLE IF NOT EXISTS file_ids (
+                digest TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                uploaded_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def digest(self, url):
+        """Хэш содержимого по ссылке (None — не скачивали или запись устарела)"""
+        with self._lock:
+            row = self._db.execute("SELECT digest, fetched_at FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[1] > self.url_ttl:
+            return None
+        return row[0]
+
+    def file_id(self, digest):
+        with self._lock:
+            row = self._db.execute("SELECT file_id FROM file_ids WHERE digest = ?", (digest,)).fetchone()
+        metrics.count('media.cache.hit' if row else 'media.cache.miss')
+        return row[0] if row else None
+
+    def remember_url(self, url, digest):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, digest, time.time()))
+            self._db.commit()
+
+    def remember_file_ids(self, pairs):
+        """Сохранить [(хэш, file_id)] после успешной загрузки"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO file_ids VALUES (?, ?, ?)",
+                                 [(digest, file_id, now) for digest, file_id in pairs])
+            self._db.commit()
+
+    def forget(self, digests):
+        """Telegram отверг file_id (например, другой бот) — в следующий раз загрузить заново"""
+        with self._lock:
+            self._db.executemany("DELETE FROM file_ids WHERE digest = ?", [(digest,) for digest in digests])
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
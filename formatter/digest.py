@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Сборка дайджеста подборки для Telegram (parse_mode=HTML)
+Готовые шаблоны, сборка через join и раскладка целых карточек по сообщениям
+"""
+
+import html
+import re
+from urllib.parse import quote_plus
+
+# Лимит Telegram — 4096 символов текста после разбора HTML сущностей (в UTF-16)
+MESSAGE_LIMIT = 4096
+SEPARATOR = "=" * 50 + "\n"
+MAP_URL = "https://yandex.ru/maps/?text="
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Шаблоны компилируются один раз: .format связывается при импорте модуля
+_HEADER = ("✨ <b>{name}</b> ✨\n📍 {territory}\n📊 {count} событий\n" + SEPARATOR + "\n").format
+# Потоковый дайджест уходит частями, пока события ещё собираются — без общего числа
+_STREAM_HEADER = ("✨ <b>{name}</b> ✨\n📍 {territory}\n" + SEPARATOR + "\n").format
+_CONTINUED = "✨ <b>{name}</b> ✨ (продолжение)\n\n".format
+_TITLE = "<b>{num}. {title}</b>\n⭐ Качество: {quality}/10\n".format
+_DATE = "📅 {date}\n".format
+_DATE_TIME = "📅 {date} в {time}\n".format
+_DETAILS = "📍 {place}\n💰 {price}\n📌 Источник: {source}\n".format
+_LINKS = "🔗 <a href=\"{url}\">Ссылка</a> | <a href=\"{map_url}\">На карте</a>\n\n".format
+_FOOTER = (SEPARATOR + "📍 <b>Все события на карте:</b>\n<a href=\"{map_url}\">Открыть в Яндекс.Картах</a>\n").format
+
+
+def telegram_length(message):
+    """Длина сообщения так, как её считает Telegram: без тегов, с раскрытыми
+    сущностями, в кодовых единицах UTF-16 (эмодзи — две единицы)"""
+    text = html.unescape(_TAG_RE.sub('', message))
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _text(value, limit=None):
+    value = value[:limit] if limit else value
+    return html.escape(value, quote=False)
+
+
+def _attr(value):
+    return html.escape(value, quote=True)
+
+
+def map_url(places):
+    return MAP_URL + quote_plus(", ".join(places))
+
+
+class DigestRenderer:
+    def __init__(self, limit=MESSAGE_LIMIT):
+        self.limit = limit
+
+    def render_event(self, num, event):
+        """HTML карточка одного события"""
+        place = (event.place or 'не указано')[:50]
+        parts = [
+            _TITLE(num=num, title=_text(event.title or 'Событие', 70),
+                   quality=event.quality if event.quality is not None else '?'),
+            _DATE_TIME(date=event.date, time=event.time) if event.time
+            else _DATE(date=event.date or 'не указано'),
+            _DETAILS(place=_text(place), price=_text(event.price_label), source=_text(event.source.value)),
+        ]
+        if event.url:
+            parts.append(_LINKS(url=_attr(event.url), map_url=_attr(map_url([place]))))
+        else:
+            parts.append("\n")
+        return "".join(parts)
+
+    def render(self, collection, territory, events):
+        """Список сообщений: целые карточки, каждое сообщение в пределах лимита"""
+        return [message for message, _ in self.render_parts(collection, territory, events)]
+
+    def render_parts(self, collection, territory, events):
+        """Как render, но [(сообщение, события в нём)]: доставленные части учитываются по отдельности"""
+        header = _HEADER(name=_text(collection['name']), territory=_text(territory['name']), count=len(events))
+        continued = _CONTINUED(name=_text(collection['name']))
+
+        # Адреса ссылок в лимит не входят, а название и место обрезаны —
+        # одна карточка всегда помещается в сообщение
+        blocks = [self.render_event(num, event) for num, event in enumerate(events, 1)]
+        owners = list(events)
+
+        locations = list(dict.fromkeys(e.place[:30] for e in events if e.place))[:5]
+        if locations:
+            blocks.append(_FOOTER(map_url=_attr(map_url(locations))))
+            owners.append(None)
+
+        return self._pack(header, continued, blocks, owners)
+
+    def pack(self, header, continued, blocks):
+        """Жадная раскладка по порядку: для блоков, которые нельзя переставлять,
+        она даёт минимальное число сообщений"""
+        return [message for message, _ in self._pack(header, continued, blocks, [None] * len(blocks))]
+
+    def _pack(self, header, continued, blocks, owners):
+        """[(сообщение, события его блоков)]; owners — событие блока или None (подвал)"""
+        messages = []
+        current, events = [header], []
+        used = telegram_length(header)
+
+        for block, owner in zip(blocks, owners):
+            size = telegram_length(block)
+            if used + size > self.limit and len(current) > 1:
+                messages.append(("".join(current), events))
+                current, events = [continued], []
+                used = telegram_length(continued)
+            current.append(block)
+            if owner is not None:
+                events.append(owner)
+            used += size
+
+        messages.append(("".join(current), events))
+        return messages
+
+
+class DigestStream:
+    """Дайджест, собираемый по мере поступления событий: как только набралось
+    на полное сообщение, оно отдаётся на отправку, не дожидаясь остальных.
+    Карточки идут в порядке поступления, а не по дате."""
+
+    def __init__(self, renderer, collection, territory, max_count=None):
+        self.renderer = renderer
+        self.max_count = max_count if max_count is not None else collection.get('max_count', 10)
+        self.continued = _CONTINUED(name=_text(collection['name']))
+        self.count = 0
+        self.places = {}
+
+        self._current = [_STREAM_HEADER(name=_text(collection['name']), territory=_text(territory['name']))]
+        self._used = telegram_length(self._current[0])
+        self._events = []
+
+    @property
+    def full(self):
+        return self.count >= self.max_count
+
+    def add(self, event):
+        """Добавить событие; вернуть готовые к отправке [(сообщение, события в нём)]"""
+        self.count += 1
+        if event.place and len(self.places) < 5:
+            self.places.setdefault(event.place[:30])
+
+        block = self.renderer.render_event(self.count, event)
+        ready = self._append(block)
+        self._events.append(event)
+        return ready
+
+    def finish(self):
+        """Остаток дайджеста (с общей ссылкой на карту)"""
+        if not self.count:
+            return []
+        ready = []
+        if self.places:
+            ready = self._append(_FOOTER(map_url=_attr(map_url(list(self.places)))))
+        ready.append(("".join(self._current), self._events))
+        self._current, self._events = [], []
+        return ready
+
+    def _append(self, block):
+        size = telegram_length(block)
+        ready = []
+        if self._used + size > self.renderer.limit and len(self._current) > 1:
+            ready.append(("".join(self._current), self._events))
+            self._current, self._events = [self.continued], []
+            self._used = telegram_length(self.continued)
+        self._current.append(block)
+        self._used += size
+        return ready
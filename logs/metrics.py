@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Метрики запуска: таймеры этапов, счётчики и гистограммы задержек
+Сводка пишется строкой JSONL в logs/metrics.jsonl, по --profile — cProfile горячих участков
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.jsonl')
+# Для гистограммы храним не больше стольких замеров на метрику (равномерная выборка)
+RESERVOIR_SIZE = 2048
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.samples[slot] = value
+
+    def percentile(self, q):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': round(self.total, 4),
+            'p50': round(self.percentile(0.5), 4),
+            'p90': round(self.percentile(0.9), 4),
+            'p99': round(self.percentile(0.99), 4),
+            'max': round(self.max, 4),
+        }
+
+
+class Metrics:
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self.profile_dir = None
+        # (участок, поток) -> профайлер: в 3.11 один Profile, включённый в двух потоках,
+        # молча смешивает их стеки, поэтому у каждого потока свой, а при сбросе они складываются
+        self._profiles = {}
+        self._profiling = threading.local()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms[name].add(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Длительность блока (сек) в гистограмму name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def enable_profiling(self, directory=None):
+        self.profile_dir = directory or os.path.dirname(METRICS_PATH)
+
+    @contextmanager
+    def profile(self, name):
+        """cProfile блока (если включён --profile); вложенные участки не профилируются повторно"""
+        if self.profile_dir is None or getattr(self._profiling, 'active', False):
+            yield
+            return
+
+        with self._lock:
+            profiler = self._profiles.setdefault((name, threading.get_ident()), cProfile.Profile())
+        self._profiling.active = True
+        try:
+            profiler.enable()
+        except ValueError:
+            # 3.12+: профилировщик процесса один, и он уже занят другим потоком — пропускаем
+            self._profiling.active = False
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._profiling.active = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'timers': {name: h.summary() for name, h in self.histograms.items() if h.count},
+            }
+
+    def flush(self, path=None, **context):
+        """Дописать сводку строкой JSONL и начать счёт заново"""
+        record = {'ts': round(time.time(), 3), **context, **self.snapshot()}
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            profiles, self._profiles = self._profiles, {}
+
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        merged = {}
+        for (name, _), profiler in profiles.items():
+            profiler.create_stats()
+            if not profiler.stats:
+                # Участок в этом потоке так и не профилировался (см. ValueError выше)
+                continue
+            if name in merged:
+                merged[name].add(profiler)
+            else:
+                merged[name] = pstats.Stats(profiler)
+        for name, stats in merged.items():
+            stats.dump_stats(os.path.join(self.profile_dir, f"profile-{stamp}-{name}.pstats"))
+        return record
+
+
+# Один набор метрик на процесс
+metrics = Metrics()
@@ -2,13 +2,21 @@
 """
 Event Aggregator - ПОЛНАЯ ВЕРСИЯ (ИСПРАВЛЕННАЯ)
 С AI фильтрацией, множественными источниками, полным форматом
+
+Запуск:
+  python main.py                      — интерактивный выбор одной подборки
+  python main.py --menu               — выбор нескольких подборок и территорий (ui/ui/menu.py)
+  python main.py --batch [--territories moscow,SPB] [--collections free_today] [--period week]
+                                      — без вопросов; по умолчанию все территории и подборки
+  python main.py --daemon             — постоянно, каждая тема по своему расписанию (daemon.py)
+  python main.py --batch --stream     — потоковый конвейер (pipeline.py): первые сообщения уходят,
+                                        пока сбор и AI анализ ещё идут
 """
 
 import sys
 import os
-import requests
+import argparse
 from datetime import datetime, timedelta
-import yaml
 import logging
 from dotenv import load_dotenv
 
@@ -17,43 +25,50 @@ logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from scraper.multi_source_scraper import MultiSourceEventScraper
+# Тяжёлые модули (requests, bs4, AI) импортируются там, где нужны: меню и --help
+# поднимаются без них, а ошибка в config.yaml видна до первого сетевого запроса
+from settings import ConfigError, load_config
+from processor.event import Event, EventSource
+from processor.event_index import EventIndex, compile_collection
+from logs.metrics import metrics
 
-# Импортируем AI анализатор
-try:
-    from ai.event_analyzer import EventAnalyzer
-    ai_available = True
-except:
-    ai_available = False
+TIME_RANGES = {1: 'today', 2: 'tomorrow', 3: 'week', 4: 'month'}
 
-def main():
-    print("\n" + "=" * 70)
-    print("EVENT AGGREGATOR - ПОЛНАЯ ВЕРСИЯ С AI".center(70))
-    print("=" * 70 + "\n")
-    
-    token = os.getenv('TELEGRAM_BOT_TOKEN')
-    group_id = os.getenv('TELEGRAM_GROUP_ID')
-    ai_key = os.getenv('OPENROUTER_API_KEY')
-    
-    if not token or not group_id:
-        print("❌ .env не найден!")
-        return
-    
-    with open('config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-    
+def parse_args():
+    parser = argparse.ArgumentParser(description="Event Aggregator")
+    parser.add_argument('--batch', action='store_true', help="без интерактивных вопросов")
+    parser.add_argument('--daemon', action='store_true', help="постоянная работа по расписанию (секция daemon в config.yaml)")
+    parser.add_argument('--menu', action='store_true', help="выбор подборок и территорий через меню")
+    parser.add_argument('--territories', help="ключи территорий через запятую (по умолчанию все)")
+    parser.add_argument('--collections', help="ключи подборок через запятую (по умолчанию все)")
+    parser.add_argument('--stream', action='store_true', help="потоковый конвейер (секция pipeline в config.yaml)")
+    parser.add_argument('--profile', action='store_true', help="cProfile горячих участков в logs/*.pstats")
+    parser.add_argument('--period', choices=list(TIME_RANGES.values()), default='week')
+    return parser.parse_args()
+
+def select_keys(available, raw):
+    """Ключи из строки через запятую; пустая строка — все"""
+    if not raw:
+        return list(available)
+    keys = [key.strip() for key in raw.split(',') if key.strip()]
+    unknown = [key for key in keys if key not in available]
+    if unknown:
+        raise SystemExit(f"❌ Неизвестные ключи: {', '.join(unknown)}")
+    return keys
+
+def ask_single(config):
+    """Интерактивный режим: одна подборка, одна территория, один период"""
     print("📦 ПОДБОРКА (Enter=1):")
     for i, key in enumerate(config['collections'].keys(), 1):
         print(f"   {i}. {config['collections'][key]['name']}")
     col_idx = int(input("\n> ").strip() or "1") - 1
-    collection = list(config['collections'].values())[col_idx]
+    col_key = list(config['collections'].keys())[col_idx]
     
     print("\n📍 ТЕРРИТОРИЯ (Enter=1):")
     for i, key in enumerate(config['territories'].keys(), 1):
         print(f"   {i}. {config['territories'][key]['name']}")
     terr_idx = int(input("\n> ").strip() or "1") - 1
     terr_key = list(config['territories'].keys())[terr_idx]
-    territory = config['territories'][terr_key]
     
     print("\n⏰ ПЕРИОД (Enter=3):")
     print("   1. Сегодня")
@@ -62,145 +77,431 @@ def main():
     print("   4. На месяц")
     period_choice = int(input("\n> ").strip() or "3")
     
-    time_ranges = {1: 'today', 2: 'tomorrow', 3: 'week', 4: 'month'}
-    time_range = time_ranges.get(period_choice, 'week')
+    return [terr_key], [col_key], TIME_RANGES.get(period_choice, 'week')
+
+def main():
+    args = parse_args()
     
-    scraper = MultiSourceEventScraper()
-    print(f"\n🔄 Сбор: {territory['name']} ({time_range})...")
-    print("   Источники: KudaGo, Яндекс.Афиша, Сайты площадок")
+    print("\n" + "=" * 70)
+    print("EVENT AGGREGATOR - ПОЛНАЯ ВЕРСИЯ С AI".center(70))
+    print("=" * 70 + "\n")
     
-    # ИСПРАВЛЕНИЕ 1: Убираем лишний параметр
-    events = scraper.scrape_all(territory['name'], time_range)
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(f"❌ Ошибка в config.yaml: {e}")
+        return
     
-    if not events:
-        print("❌ События не найдены")
+    token = os.getenv('TELEGRAM_BOT_TOKEN')
+    group_id = os.getenv('TELEGRAM_GROUP_ID')
+    ai_key = os.getenv('OPENROUTER_API_KEY')
+    
+    if not token or not group_id:
+        print("❌ .env не найден!")
         return
     
-    print(f"✓ Найдено {len(events)} событий")
+    if args.profile:
+        metrics.enable_profiling()
+    if args.stream:
+        config.setdefault('pipeline', {})['streaming'] = True
     
-    # AI ФИЛЬТРАЦИЯ
-    if ai_available and ai_key:
-        print("🤖 AI фильтрация событий...")
-        analyzer = EventAnalyzer(ai_key)
+    if args.daemon:
+        run_daemon(config, token, group_id, ai_key)
+        return
+    
+    if args.menu:
+        from ui.ui.menu import InteractiveMenu
+        choice = InteractiveMenu().run()
+        terr_keys, col_keys, time_range = choice['territories'], choice['collections'], args.period
+    elif args.batch:
+        terr_keys = select_keys(config['territories'], args.territories)
+        col_keys = select_keys(config['collections'], args.collections)
+        time_range = args.period
+    else:
+        terr_keys, col_keys, time_range = ask_single(config)
+    
+    run_batch(config, terr_keys, col_keys, time_range, token, group_id, ai_key)
+
+class Runtime:
+    """Долгоживущие ресурсы запуска: пул соединений, скрапер, кэши, хранилище, очередь отправки"""
+    
+    def __init__(self, config, token, ai_key):
+        from scraper.multi_source_scraper import MultiSourceEventScraper, KUDAGO_EVENTS_URL
+        from scraper.http_client import configure_http_client
+        from data.event_store import EventStore
+        from formatter.digest import DigestRenderer
+        from telegram_bot.telegram_bot.send_scheduler import BackgroundSender, TELEGRAM_API_URL, http_sender
         
-        filtered = []
-        for i, event in enumerate(events):
-            analysis = analyzer.analyze_quality(event)
-            
-            # Пропускаем плохие события
-            if analysis.get('has_bad_content'):
-                continue
-            
-            if analysis.get('quality', 0) < 5:
-                continue
-            
-            # Добавляем AI данные в событие
-            event['quality'] = analysis.get('quality', 5)
-            event['ai_summary'] = analysis.get('summary', '')
-            event['is_relevant'] = analysis.get('is_relevant', True)
-            
-            filtered.append(event)
-            print(f"   ✓ {i+1}. {event.get('title', '')[:40]}... [качество: {analysis.get('quality', 5)}/10]")
+        self.config = config
+        # Общий пул соединений для скрапера, AI и Telegram
+        self.http = configure_http_client(config.get('http'))
+        scraper_settings = config.get('scraper') or {}
+        endpoints = config.get('endpoints') or {}
+        self.scraper = MultiSourceEventScraper(
+            max_workers=scraper_settings.get('max_workers', 8),
+            deadline=scraper_settings.get('deadline', 30),
+            sources=config.get('sources'),
+            breaker_state=scraper_settings.get('breaker_state'),
+            paginate=scraper_settings.get('paginate', False),
+            kudago_prefetch=scraper_settings.get('kudago_prefetch', 4),
+            kudago_url=endpoints.get('kudago', KUDAGO_EVENTS_URL)
+        )
+        
+        # Хранилище виденного: дельта-сбор и пропуск уже опубликованного
+        self.store = None
+        store_settings = config.get('store')
+        if store_settings and store_settings.get('enabled', True):
+            self.store = EventStore(store_settings.get('path', 'data/cache/events.sqlite3'))
         
-        events = filtered
-        print(f"✓ После фильтрации: {len(events)} событий")
+        self.analyzer, self.cache = build_analyzer(config, ai_key)
+        
+        # Отправка идёт в фоне: темы параллельно, пока собирается следующая территория
+        send_settings = (config.get('telegram') or {}).get('send') or {}
+        telegram_url = endpoints.get('telegram', TELEGRAM_API_URL)
+        self.sender = BackgroundSender(lambda: http_sender(self.http, token, telegram_url), **send_settings)
+        self.renderer = DigestRenderer()
+        self.media = build_media(config, self.http)
+    
+    def close(self):
+        self.scraper.close()
+        self.sender.close()
+        if self.media is not None:
+            self.media.close()
+        if self.sender.scheduler.flood_waits:
+            print(f"   Telegram просил подождать (429): {self.sender.scheduler.flood_waits} раз")
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"   Кэш AI: {stats['hits']} попаданий, {stats['misses']} промахов")
+            self.cache.close()
+        if self.store is not None:
+            self.store.close()
+        # Последним: отправка и фото ходят через этот же клиент; HTTP кэш сохраняет время чтения
+        self.http.close()
+
+def run_batch(config, terr_keys, col_keys, time_range, token, group_id, ai_key):
+    runtime = Runtime(config, token, ai_key)
+    try:
+        publish(runtime, group_id, terr_keys, col_keys, time_range)
+    finally:
+        runtime.close()
+        # Сводка метрик запуска — строкой в logs/metrics.jsonl
+        metrics.flush(mode='batch', territories=terr_keys, collections=col_keys, period=time_range)
+
+def run_daemon(config, token, group_id, ai_key):
+    """Постоянная работа: кэши и пулы соединений живут между заданиями"""
+    from daemon import Daemon, build_jobs
+    
+    runtime = Runtime(config, token, ai_key)
     
-    max_count = min(collection.get('max_count', 10), len(events))
-    events = events[:max_count]
+    def run_job(terr_keys, col_keys, time_range):
+        try:
+            publish(runtime, group_id, terr_keys, col_keys, time_range)
+        finally:
+            metrics.flush(mode='daemon', territories=terr_keys, collections=col_keys, period=time_range)
     
-    if not events:
-        print("❌ После фильтрации событий не осталось")
+    daemon = Daemon(build_jobs(config, config.get('daemon') or {}), run_job)
+    daemon.install_signal_handlers()
+    try:
+        daemon.run()
+    finally:
+        runtime.close()
+
+def publish(runtime, group_id, terr_keys, col_keys, time_range):
+    """Каждая территория собирается и анализируется один раз, результат раздаётся всем подборкам"""
+    config, scraper, store, analyzer = runtime.config, runtime.scraper, runtime.store, runtime.analyzer
+    collections = {key: config['collections'][key] for key in col_keys}
+    if (config.get('pipeline') or {}).get('streaming'):
+        publish_streaming(runtime, group_id, terr_keys, collections, time_range)
         return
+    posts = []
     
-    # ФОРМИРУЕМ СООБЩЕНИЕ
-    msg = f"✨ <b>{collection['name']}</b> ✨\n"
-    msg += f"📍 {territory['name']}\n"
-    msg += f"📊 {len(events)} событий\n"
-    msg += "=" * 50 + "\n\n"
-    
-    for i, e in enumerate(events, 1):
-        title = e.get('title', 'Событие')[:70]
-        date = e.get('date', 'не указано')
-        time = e.get('time', '')
-        place = e.get('place', 'не указано')[:50]
-        price = e.get('price', 'Бесплатно')
-        url = e.get('url', '')
-        source = e.get('source', 'Неизвестно')
-        quality = e.get('quality', '?')
+    for terr_key in terr_keys:
+        territory = config['territories'][terr_key]
+        with metrics.timer('collect'):
+            events = collect_events(scraper, store, config, terr_key, territory, time_range)
+        metrics.count('collect.out', len(events))
+        if not events:
+            print("❌ События не найдены")
+            continue
         
-        msg += f"<b>{i}. {title}</b>\n"
-        msg += f"⭐ Качество: {quality}/10\n"
-        msg += f"📅 {date}"
-        if time:
-            msg += f" в {time}"
-        msg += "\n"
-        msg += f"📍 {place}\n"
-        msg += f"💰 {price}\n"
-        msg += f"📌 Источник: {source}\n"
-        
-        if url:
-            msg += f"🔗 <a href='{url}'>Ссылка</a>"
-            # Генерируем Яндекс.Карты ссылку
-            yandex_url = f"https://yandex.ru/maps/?text={place.replace(' ', '+')}"
-            msg += f" | <a href='{yandex_url}'>На карте</a>\n"
-        else:
-            msg += "\n"
+        if analyzer is not None:
+            metrics.count('filter.in', len(events))
+            # Профиль здесь не снимаем: этот поток в основном ждёт пачки AI. AnalysisStage
+            # профилирует предфильтр (filter.prefilter) и пачки в потоках пула (filter.ai)
+            with metrics.timer('filter'):
+                events = filter_events(analyzer, scraper, store, config, terr_key, events, time_range, collections)
+            metrics.count('filter.out', len(events))
         
-        msg += "\n"
+        # Раздаём общий результат по подборкам (в тему территории): подборка — запрос к индексу
+        index = EventIndex(events)
+        for col_key, collection in collections.items():
+            window = period_window(scraper, collection.get('period', time_range))
+            selected = index.query(compile_collection(collection, window))
+            if not selected:
+                print(f"❌ {collection['name']} / {territory['name']}: после фильтрации событий не осталось")
+                continue
+            
+            with metrics.timer('format'), metrics.profile('format'):
+                parts = runtime.renderer.render_parts(collection, territory, selected)
+            metrics.count('format.messages', len(parts))
+            album = runtime.media.album(selected) if runtime.media is not None else None
+            futures = post_message(runtime.sender, group_id, territory['thread_id'], [message for message, _ in parts], album)
+            if album is not None:
+                # Ошибка альбома публикацию не отменяет: текст к этому времени уже доставлен
+                runtime.media.watch(album, futures.pop())
+            posts.append((terr_key, territory, col_key, collection, list(zip(futures, (events for _, events in parts)))))
     
-    # Добавляем общую Яндекс.Карты ссылку
-    locations = [e.get('place', '') for e in events if e.get('place')]
-    if locations:
-        msg += "=" * 50 + "\n"
-        msg += "📍 <b>Все события на карте:</b>\n"
-        map_url = "https://yandex.ru/maps/?text=" + "%2C".join([l.replace(' ', '+')[:30] for l in locations[:5]])
-        msg += f"<a href='{map_url}'>Открыть в Яндекс.Картах</a>\n"
+    for terr_key, territory, col_key, collection, sent in posts:
+        print(f"\n📤 {collection['name']} / {territory['name']}:")
+        record_posted(store, terr_key, territory, col_key, sent)
+
+def publish_streaming(runtime, group_id, terr_keys, collections, time_range):
+    """Потоковый режим (pipeline.py): сообщение уходит, как только набралось,
+    карточки в дайджесте идут в порядке поступления, а не по дате"""
+    from pipeline import StreamingPipeline
+    
+    config, scraper, store = runtime.config, runtime.scraper, runtime.store
+    settings = config.get('pipeline') or {}
+    pipeline = StreamingPipeline(runtime, group_id, settings.get('queue_size', 256), settings.get('flush_interval', 0.5))
+    stage, prefilter = None, None
+    if runtime.analyzer is not None:
+        stage, prefilter = build_stage(runtime.analyzer, scraper, config, collections, time_range)
+    posts = []
+    
+    for terr_key in terr_keys:
+        territory = config['territories'][terr_key]
+        since = delta_since(store, config, terr_key, time_range)
+        print(f"\n🔄 Потоковый сбор: {territory['name']} ({time_range})...")
+        with metrics.timer('pipeline'):
+            sent = pipeline.run(terr_key, territory, collections, time_range, since, stage, prefilter,
+                                lambda period: period_window(scraper, period))
+        if stage is not None:
+            print(f"   Проанализировано AI {stage.analyzed} событий")
+        if not sent:
+            print("❌ События не найдены")
+            continue
+        posts.append((terr_key, territory, sent))
+    
+    for terr_key, territory, sent in posts:
+        for col_key, collection in collections.items():
+            parts = [(future, events) for key, future, events in sent if key == col_key]
+            if not parts:
+                print(f"❌ {collection['name']} / {territory['name']}: событий не нашлось")
+                continue
+            print(f"\n📤 {collection['name']} / {territory['name']}:")
+            record_posted(store, terr_key, territory, col_key, parts)
+
+def delta_since(store, config, terr_key, time_range):
+    """Отметка инкрементального сбора KudaGo (None — собираем всё)"""
+    if store is None:
+        return None
+    max_age = config.get('store', {}).get('delta_max_age', 21600)
+    return store.watermark(terr_key, EventSource.KUDAGO.value, time_range, max_age)
+
+def collect_events(scraper, store, config, terr_key, territory, time_range):
+    """Сбор событий территории (с учётом уже виденного в хранилище)"""
+    from scraper.sources import complete_sources
     
-    # ИСПРАВЛЕНИЕ 2: Разбиваем длинные сообщения
+    since = delta_since(store, config, terr_key, time_range)
+    
+    print(f"\n🔄 Сбор: {territory['name']} ({time_range})...")
+    print(f"   Источники: {', '.join(source.name for source in scraper.sources)}")
+    if len(territory.get('cities') or ()) > 1:
+        print(f"   Города: {', '.join(territory['cities'])} (радиус {territory.get('search_radius_km')} км)")
+    if since:
+        print(f"   KudaGo: только новое с {datetime.fromtimestamp(since).strftime('%d.%m %H:%M')}")
+    
+    # ИСПРАВЛЕНИЕ 1: Убираем лишний параметр
+    results = {}
+    events = scraper.scrape_all(territory, time_range, published_after=since, results=results)
+    
+    if store is not None:
+        # Источник упал или не уложился в дедлайн — его отметку не двигаем
+        store.record_fetched(terr_key, events, time_range, full_fetch=since is None,
+                             complete=complete_sources(results))
+        
+        # Собранное в прошлые запуски, но ещё не опубликованное
+        now, _, end_date = scraper.time_window(time_range)
+        known = {e.uid for e in events}
+        for event in store.pending(terr_key, (now - timedelta(days=1)).timestamp(), end_date.timestamp()):
+            if event.uid not in known:
+                events.append(event)
+        events.sort(key=Event.sort_key)
+        
+        total = len(events)
+        events = store.unpublished(events, territory['thread_id'])
+        if total > len(events):
+            print(f"   Пропущено уже опубликованных: {total - len(events)}")
+    
+    if events:
+        print(f"✓ Найдено {len(events)} событий")
+    return events
+
+def build_analyzer(config, ai_key):
+    """EventAnalyzer с кэшем вердиктов (или (None, None), если AI недоступен)"""
+    if not ai_key:
+        return None, None
     try:
-        url_api = f"https://api.telegram.org/bot{token}/sendMessage"
+        from ai.event_analyzer import EventAnalyzer
+        from ai.rate_limiter import TokenBucket
+    except ImportError as e:
+        logger.warning(f"AI недоступен: {e}")
+        return None, None
+    
+    ai_settings = config.get('ai', {})
+    cache = None
+    cache_settings = ai_settings.get('cache')
+    if cache_settings and cache_settings.get('enabled', True):
+        from data.analysis_cache import AnalysisCache
+        cache = AnalysisCache(**{k: v for k, v in cache_settings.items() if k != 'enabled'})
+    endpoint = (config.get('endpoints') or {}).get('openrouter')
+    # Один лимит на процесс: территории и задания демона делят квоту OpenRouter
+    rate_limiter = TokenBucket(ai_settings.get('requests_per_minute', 20))
+    analyzer = EventAnalyzer(ai_key, cache=cache, rate_limiter=rate_limiter, **({'endpoint': endpoint} if endpoint else {}),
+                             **build_local_model(ai_settings.get('local_model'), ai_settings.get('min_quality', 5)))
+    return analyzer, cache
+
+def build_local_model(settings, min_quality=5):
+    """Параметры локальной модели качества для EventAnalyzer (пусто — выключена, не обучена
+    или обучена с другим порогом качества, чем ai.min_quality)"""
+    if not settings or not settings.get('enabled', True):
+        return {}
+    from ai.local_model import QualityModel
+    
+    path = settings.get('path', 'data/cache/quality_model.json')
+    model = QualityModel.load(path)
+    if model is None:
+        print(f"   Локальная модель не обучена ({path}): python -m ai.local_model")
+        return {}
+    if model.threshold != min_quality:
+        # Модель отсеивает по своему порогу — с другим ai.min_quality она отбросит лишнее
+        logger.warning(f"Локальная модель обучена с порогом {model.threshold}, а ai.min_quality = {min_quality}: "
+                       f"модель не используется, переобучите: python -m ai.local_model --min-quality {min_quality}")
+        return {}
+    return {'local_model': model, 'confidence': settings.get('confidence', 0.9)}
+
+def build_stage(analyzer, scraper, config, collections, time_range):
+    """AnalysisStage и Prefilter из секции ai; для одной подборки — с её условиями"""
+    from ai.filter_stage import AnalysisStage
+    from ai.prefilter import Prefilter
+    
+    ai_settings = config.get('ai', {})
+    single = next(iter(collections.values())) if len(collections) == 1 else None
+    
+    stage = AnalysisStage(
+        analyzer,
+        workers=ai_settings.get('workers', 4),
+        batch_size=ai_settings.get('batch_size', 10),
+        min_quality=ai_settings.get('min_quality', 5)
+    )
+    
+    prefilter = None
+    prefilter_settings = ai_settings.get('prefilter')
+    if prefilter_settings and prefilter_settings.get('enabled', True):
+        # Для одной подборки — её собственный период: ранняя остановка не наберёт лишнего
+        period = single.get('period', time_range) if single else time_range
+        prefilter = Prefilter(prefilter_settings, single, period_window(scraper, period))
+    return stage, prefilter
+
+def filter_events(analyzer, scraper, store, config, terr_key, events, time_range, collections):
+    """AI фильтрация. Для одной подборки — с её ценовыми условиями и ранней остановкой,
+    для нескольких — один общий проход, условия подборок применяются при раздаче"""
+    print("🤖 AI фильтрация событий...")
+    single = next(iter(collections.values())) if len(collections) == 1 else None
+    stage, prefilter = build_stage(analyzer, scraper, config, collections, time_range)
+    
+    filtered = []
+    max_count = single.get('max_count', 10) if single else None
+    accepted = stage.run(events, max_count=max_count, prefilter=prefilter)
+    for i, (event, analysis) in enumerate(accepted, 1):
+        # Добавляем AI данные в событие
+        event.quality = analysis.get('quality', 5)
+        event.ai_summary = analysis.get('summary', '')
+        event.is_relevant = analysis.get('is_relevant', True)
         
-        # Проверка длины сообщения (лимит Telegram = 4096 символов)
-        if len(msg) > 4000:
-            print(f"⚠️ Сообщение слишком длинное ({len(msg)} символов)")
-            print("📦 Разбиваю на части...")
-            
-            # Разбиваем на части по 3500 символов
-            msg_parts = [msg[i:i+3500] for i in range(0, len(msg), 3500)]
-            
-            for part_num, part in enumerate(msg_parts, 1):
-                data = {
-                    "chat_id": int(group_id),
-                    "text": part,
-                    "message_thread_id": territory['thread_id'],
-                    "parse_mode": "HTML",
-                    "disable_web_page_preview": False
-                }
-                response = requests.post(url_api, json=data, timeout=10)
-                if response.status_code != 200:
-                    print(f"❌ Ошибка части {part_num}: {response.text}")
-                    return
-            
-            print(f"✅ Опубликовано {len(events)} событий в {len(msg_parts)} сообщениях!")
-        else:
-            # Сообщение короткое - отправляем одним куском
-            data = {
-                "chat_id": int(group_id),
-                "text": msg,
-                "message_thread_id": territory['thread_id'],
-                "parse_mode": "HTML",
-                "disable_web_page_preview": False
-            }
-            response = requests.post(url_api, json=data, timeout=10)
-            
-            if response.status_code == 200:
-                print(f"✅ Опубликовано {len(events)} событий!")
-                print(f"📱 Сообщение отправлено в Telegram")
-            else:
-                print(f"❌ Ошибка Telegram: {response.text}")
+        filtered.append(event)
+        print(f"   ✓ {i}. {event.title[:40]}... [качество: {event.quality}/10]")
+    
+    if prefilter is not None:
+        print(f"   Предфильтр: {prefilter.report()}")
+    print(f"   Проанализировано AI {stage.analyzed} из {len(events)} событий")
+    if analyzer.local_model is not None:
+        print(f"   Из них отсеяно локальной моделью: {analyzer.local_decisions}")
+    print(f"✓ После фильтрации: {len(filtered)} событий")
     
-    except Exception as e:
-        print(f"❌ Ошибка: {e}")
+    if store is not None:
+        store.record_analyzed(terr_key, filtered)
+    return filtered
+
+def build_media(config, http):
+    """Фото событий альбомами (секция telegram.media) или None, если выключено"""
+    from data.media_cache import MediaCache
+    from telegram_bot.telegram_bot.media import MediaLibrary
+    
+    settings = dict((config.get('telegram') or {}).get('media') or {})
+    if not settings.pop('enabled', True):
+        return None
+    cache_path = settings.pop('cache', 'data/cache/media.sqlite3')
+    cache = MediaCache(cache_path) if cache_path else None
+    return MediaLibrary(http, cache, **settings)
+
+def period_window(scraper, period):
+    """(начало, конец) периода в unix-времени; как и при сборе, захватываем сутки назад"""
+    now, start_date, end_date = scraper.time_window(period)
+    if start_date <= now:
+        start_date = now - timedelta(days=1)
+    return start_date.timestamp(), end_date.timestamp()
+
+def post_message(sender, group_id, thread_id, messages, album=None):
+    """Поставить сообщения в очередь темы группы одной цепочкой; вернуть futures отправки.
+
+    album (MediaGroup) идёт последним звеном: уходит, только если дошёл весь текст,
+    и не повторяется вместе с недоставленным дайджестом. Его future — последний в списке.
+    """
+    if len(messages) > 1:
+        print(f"📦 Дайджест разложен на {len(messages)} сообщения")
+    
+    # Порядок частей сохраняет очередь темы; после неотправленной части остальные не уходят
+    options = {'parse_mode': "HTML", 'disable_web_page_preview': False}
+    chain = [(part, options) for part in messages]
+    if album is not None:
+        chain.append((album, {'parse_mode': "HTML"}))
+    return sender.submit_chain(int(group_id), thread_id, chain)
+
+def wait_posted(futures):
+    """Дождаться отправки частей; вернуть, какие из них доставлены"""
+    delivered = []
+    for part_num, future in enumerate(futures, 1):
+        try:
+            future.result()
+            delivered.append(True)
+        except Exception as e:
+            print(f"❌ Ошибка части {part_num}: {e}")
+            delivered.append(False)
+    return delivered
+
+def record_posted(store, terr_key, territory, col_key, sent):
+    """Дождаться отправки [(future, события части)] и отметить опубликованным доставленное.
+
+    Доставленные части отмечаются, даже если другие не дошли: иначе следующий
+    запуск опубликует их в теме повторно.
+    """
+    delivered = wait_posted([future for future, _ in sent])
+    posted = [event for ok, (_, events) in zip(delivered, sent) if ok for event in events]
+    if all(delivered):
+        if len(sent) > 1:
+            print(f"✅ Опубликовано {len(posted)} событий в {len(sent)} сообщениях!")
+        else:
+            print(f"✅ Опубликовано {len(posted)} событий!")
+            print(f"📱 Сообщение отправлено в Telegram")
+    elif posted:
+        print(f"⚠️ Доставлено {sum(delivered)} из {len(sent)} частей ({len(posted)} событий)")
+    if not posted:
+        return
+    metrics.count('publish.events', len(posted))
+    if store is not None:
+        store.mark_published(terr_key, territory['thread_id'], col_key, posted)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+
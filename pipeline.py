@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Потоковый конвейер публикации: сбор → склейка дублей → AI → дайджест → отправка
+Этапы связаны очередями ограниченного размера: событие идёт дальше, как только
+готово, а медленный этап притормаживает быстрые вместо того, чтобы копить всё в памяти
+"""
+
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.prefilter import ACCEPT, ASK_LLM, REJECT
+from formatter.digest import DigestStream
+from logs.metrics import metrics
+from processor.dedup import Deduplicator
+from processor.event_index import compile_collection
+from scraper.sources import complete_sources
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stopped(Exception):
+    """Конвейер остановлен потребителем (все подборки набраны)"""
+
+
+class StreamingPipeline:
+    def __init__(self, runtime, group_id, queue_size=256, flush_interval=0.5):
+        self.runtime = runtime
+        self.group_id = group_id
+        self.queue_size = queue_size
+        # Неполная пачка для модели уходит, если новых событий нет столько секунд
+        self.flush_interval = flush_interval
+
+    def run(self, terr_key, territory, collections, time_range, since=None, stage=None, prefilter=None, window_for=None):
+        """Один проход по территории; вернуть [(ключ подборки, futures, события)] отправленного.
+
+        stage — ai.filter_stage.AnalysisStage (None — без AI), prefilter — ai.prefilter.Prefilter,
+        window_for(period) — (начало, конец) периода подборки в unix-времени.
+        """
+        self.stop = threading.Event()
+        fresh = queue.Queue(maxsize=self.queue_size)
+        accepted = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._guard, args=(self._collect, fresh, terr_key, territory, time_range, since, window_for),
+                             name='pipeline-collect', daemon=True),
+            threading.Thread(target=self._guard, args=(self._analyze, accepted, fresh, stage, prefilter, terr_key),
+                             name='pipeline-analyze', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            return self._publish(accepted, territory, collections, time_range, window_for)
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _guard(self, target, output, *args):
+        """Этап в своём потоке: по завершении (или ошибке) отправить маркер конца дальше"""
+        try:
+            target(output, *args)
+        except Stopped:
+            pass
+        except Exception as e:
+            logger.exception(f"[Pipeline] {threading.current_thread().name}: {e}")
+        finally:
+            try:
+                self._put(output, _DONE)
+            except Stopped:
+                pass
+
+    def _put(self, output, item):
+        while True:
+            if self.stop.is_set():
+                raise Stopped()
+            try:
+                output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.stop.is_set():
+                raise Stopped()
+            wait_for = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait_for <= 0:
+                raise queue.Empty()
+            try:
+                return source.get(timeout=wait_for)
+            except queue.Empty:
+                continue
+
+    def _collect(self, output, terr_key, territory, time_range, since, window_for):
+        """Сбор и склейка дублей: дальше идут только новые и ещё не опубликованные события"""
+        runtime = self.runtime
+        store = runtime.store
+        published = store.published_uids(territory['thread_id']) if store is not None else set()
+        dedup = Deduplicator()
+        newest = {}
+        chunk = []
+
+        if store is not None and window_for is not None:
+            # Собранное в прошлые запуски, но ещё не опубликованное, — уже под рукой, его первым
+            for event in store.pending(terr_key, *window_for(time_range)):
+                dedup.add(event)
+                if event.uid not in published:
+                    self._put(output, event)
+
+        results = {}
+        stream = runtime.scraper.iter_all(territory, time_range, published_after=since, queue_size=self.queue_size,
+                                          results=results)
+        try:
+            for event in stream:
+                metrics.count('dedup.in')
+                with metrics.timer('dedup'):
+                    event, is_new = dedup.add(event)
+                if not is_new:
+                    continue
+                metrics.count('dedup.out')
+
+                if event.published and event.published > getattr(newest.get(event.source), 'published', 0):
+                    newest[event.source] = event
+                chunk.append(event)
+                if store is not None and len(chunk) >= 100:
+                    # Отметку дельта-сбора двигаем только после полного прохода
+                    store.record_fetched(terr_key, chunk)
+                    chunk = []
+
+                if event.uid in published:
+                    continue
+                self._put(output, event)
+        finally:
+            stream.close()
+
+        if store is not None:
+            store.record_fetched(terr_key, chunk)
+            # Сбор дошёл до конца — отметку двигаем источникам, собранным без ошибок и таймаутов
+            store.record_fetched(terr_key, list(newest.values()), time_range, full_fetch=since is None,
+                                 complete=complete_sources(results))
+        logger.info(f"[Pipeline] Собрано {len(dedup.events)} событий, склеено дублей: {dedup.merged}")
+
+    def _analyze(self, output, source, stage, prefilter, terr_key):
+        """Предфильтр и пачки для модели; прошедшие события уходят дальше сразу"""
+        if stage is None:
+            while (event := self._get(source)) is not _DONE:
+                self._put(output, event)
+            return
+
+        store = self.runtime.store
+        stage.analyzed = 0
+        pending = []
+        # Не больше workers пачек в работе: иначе анализ обгонит раздачу и отправку
+        slots = threading.BoundedSemaphore(stage.workers)
+
+        def finish(batch, future):
+            slots.release()
+            analyses = future.result()
+            stage.analyzed += len(batch)
+            passed = []
+            for event, analysis in zip(batch, analyses):
+                if stage.qualifies(analysis):
+                    self._apply(event, analysis)
+                    passed.append(event)
+            if store is not None:
+                store.record_analyzed(terr_key, passed)
+            for event in passed:
+                self._put(output, event)
+
+        def submit():
+            batch, pending[:] = list(pending), []
+            while not slots.acquire(timeout=0.1):
+                if self.stop.is_set():
+                    raise Stopped()
+            future = executor.submit(stage.analyze_batch, batch)
+            future.add_done_callback(lambda f: self._guard_callback(finish, batch, f))
+
+        accepted = []
+        executor = ThreadPoolExecutor(max_workers=stage.workers)
+        try:
+            while True:
+                try:
+                    event = self._get(source, timeout=self.flush_interval if pending else None)
+                except queue.Empty:
+                    # Новых событий давно нет — отправляем неполную пачку, не дожидаясь
+                    submit()
+                    continue
+                if event is _DONE:
+                    break
+
+                decision, analysis = prefilter.classify(event) if prefilter is not None else (ASK_LLM, None)
+                if decision == REJECT:
+                    continue
+                if decision == ACCEPT:
+                    self._apply(event, analysis)
+                    accepted.append(event)
+                    self._put(output, event)
+                    continue
+
+                pending.append(event)
+                if len(pending) >= stage.batch_size:
+                    submit()
+
+            if pending:
+                submit()
+        finally:
+            # Колбэки пачек выполняются в потоках пула: после shutdown все их события уже в очереди
+            executor.shutdown(wait=True, cancel_futures=True)
+            if store is not None:
+                store.record_analyzed(terr_key, accepted)
+
+    def _guard_callback(self, finish, batch, future):
+        try:
+            if not future.cancelled():
+                finish(batch, future)
+        except Stopped:
+            pass
+        except Exception as e:
+            logger.error(f"[Pipeline] AI пачка: {e}")
+
+    @staticmethod
+    def _apply(event, analysis):
+        event.quality = analysis.get('quality', 5)
+        event.ai_summary = analysis.get('summary', '')
+        event.is_relevant = analysis.get('is_relevant', True)
+
+    def _publish(self, source, territory, collections, time_range, window_for):
+        """Раздача по подборкам: каждое заполненное сообщение сразу в очередь отправки"""
+        runtime = self.runtime
+        digests = {}
+        for col_key, collection in collections.items():
+            window = window_for(collection.get('period', time_range)) if window_for else None
+            digests[col_key] = (compile_collection(collection, window), DigestStream(runtime.renderer, collection, territory))
+
+        posts = []
+
+        def send(col_key, ready):
+            for message, events in ready:
+                chain = [(message, {'parse_mode': "HTML", 'disable_web_page_preview': False})]
+                album = runtime.media.album(events) if runtime.media is not None else None
+                if album is not None:
+                    # Альбом после текста одной цепочкой: без доставленного текста не уходит
+                    chain.append((album, {'parse_mode': "HTML"}))
+                future, *album_future = runtime.sender.submit_chain(int(self.group_id), territory['thread_id'], chain)
+                if album is not None:
+                    runtime.media.watch(album, album_future[0])
+                metrics.count('format.messages')
+                if not posts:
+                    logger.info("[Pipeline] Первое сообщение ушло в очередь отправки")
+                posts.append((col_key, future, events))
+
+        try:
+            while (event := self._get(source)) is not _DONE:
+                for col_key, (query, digest) in digests.items():
+                    if not digest.full and query.matches(event):
+                        with metrics.timer('format'):
+                            ready = digest.add(event)
+                        send(col_key, ready)
+
+                if all(digest.full for _, digest in digests.values()):
+                    logger.info("[Pipeline] Все подборки набраны, сбор и анализ остановлены")
+                    break
+        except Stopped:
+            pass
+
+        for col_key, (_, digest) in digests.items():
+            send(col_key, digest.finish())
+        return posts
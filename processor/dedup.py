@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Склейка дублей между источниками (KudaGo, Яндекс.Афиша, сайты площадок)
+Кандидаты ищутся через MinHash + LSH по шинглам названия — без попарного сравнения
+"""
+
+import hashlib
+import re
+import struct
+import logging
+from functools import lru_cache
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+NUM_PERM = 30
+BANDS = 10
+ROWS = NUM_PERM // BANDS
+# Больше кандидатов из одной корзины не проверяем (защита от «Экскурсия» × 1000)
+MAX_CANDIDATES = 50
+
+# Вместо NUM_PERM перестановок берём NUM_PERM независимых 16-битных слов одного blake2b:
+# тогда минимум по шинглам считается в C (map(min, zip(...))), а не циклом Python
+_UNPACK = struct.Struct(f'<{NUM_PERM}H').unpack
+# Подписей шинглов в памяти не больше этого (в режиме демона названия не кончаются)
+SHINGLE_CACHE_SIZE = 1 << 16
+
+_PUNCT_RE = re.compile(r'[^\w\s]+')
+_SPACES_RE = re.compile(r'\s+')
+# Жанровые слова, которые один источник пишет в названии, а другой нет
+_GENRE_WORDS = {
+    'концерт', 'спектакль', 'балет', 'опера', 'выставка', 'шоу', 'мюзикл', 'стендап',
+    'лекция', 'фестиваль', 'экскурсия', 'мастер', 'класс', 'премьера', 'постановка',
+}
+
+
+def normalize_title(title):
+    """Название без регистра, кавычек, пунктуации и жанровых слов"""
+    text = title.lower().replace('ё', 'е')
+    text = _SPACES_RE.sub(' ', _PUNCT_RE.sub(' ', text)).strip()
+    words = text.split(' ')
+    core = [w for w in words if w not in _GENRE_WORDS]
+    return ' '.join(core or words)
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+@lru_cache(maxsize=SHINGLE_CACHE_SIZE)
+def _hash_shingle(shingle):
+    # Частые шинглы повторяются постоянно — LRU держит их, редкие вытесняются
+    return _UNPACK(hashlib.blake2b(shingle.encode('utf-8'), digest_size=2 * NUM_PERM).digest())
+
+
+def minhash(shingle_set):
+    return tuple(map(min, zip(*map(_hash_shingle, shingle_set))))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def richness(event):
+    """Насколько полна карточка: у победителя склейки берём основу"""
+    score = len(event.description)
+    score += 200 * (event.start is not None)
+    score += 100 * bool(event.place)
+    score += 50 * (event.price_min is not None)
+    score += 20 * len(event.images)
+    return score
+
+
+def merge_into(target, other):
+    """Дополнить target полями other, где они богаче"""
+    if len(other.description) > len(target.description):
+        target.description = other.description
+    if target.start is None:
+        target.start = other.start
+    if not target.place and other.place:
+        target.place = other.place
+    if target.coords is None:
+        target.coords = other.coords
+    if target.price_min is None and other.price_min is not None:
+        target.price_min, target.price_max = other.price_min, other.price_max
+        target.price_text = target.price_text or other.price_text
+    if not target.url:
+        target.url = other.url
+    if not target.source_id:
+        target.source_id = other.source_id
+    if other.images:
+        target.images = tuple(dict.fromkeys(target.images + other.images))
+
+
+class Deduplicator:
+    """Инкрементальный индекс: события можно добавлять по одному (потоково)"""
+
+    def __init__(self, title_threshold=0.6, loose_title_threshold=0.8, start_tolerance=3600):
+        # Порог похожести названий при совпадающем времени и при неизвестном времени
+        self.title_threshold = title_threshold
+        self.loose_title_threshold = loose_title_threshold
+        self.start_tolerance = start_tolerance
+
+        self.events = []
+        self._shingles = []
+        # Корзины LSH: (номер полосы, кусок подписи) -> упорядоченное множество индексов
+        self._buckets = {}
+        self.merged = 0
+
+    def add(self, event):
+        """Добавить событие; вернуть (итоговое событие, True если это новое)"""
+        shingle_set = shingles(normalize_title(event.title))
+        signature = minhash(shingle_set)
+        band_keys = [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+        seen = set()
+        for key in band_keys:
+            for idx in islice(self._buckets.get(key, ()), MAX_CANDIDATES):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                if self._is_duplicate(event, shingle_set, idx):
+                    return self._merge(idx, event, band_keys), False
+
+        idx = len(self.events)
+        self.events.append(event)
+        self._shingles.append(shingle_set)
+        for key in band_keys:
+            self._buckets.setdefault(key, {})[idx] = None
+        return event, True
+
+    def _is_duplicate(self, event, shingle_set, idx):
+        other = self.events[idx]
+
+        if event.start is not None and other.start is not None:
+            # Один спектакль в разные дни — разные события
+            if abs(event.start - other.start) > self.start_tolerance:
+                return False
+            threshold = self.title_threshold
+        else:
+            threshold = self.loose_title_threshold
+
+        if jaccard(shingle_set, self._shingles[idx]) < threshold:
+            return False
+
+        return self._places_compatible(event.place, other.place)
+
+    def _places_compatible(self, a, b):
+        # Пустое место или домен сайта площадки не противоречат названию площадки
+        if not a or not b or self._is_domain(a) or self._is_domain(b):
+            return True
+        return jaccard(shingles(normalize_title(a)), shingles(normalize_title(b))) >= 0.3
+
+    @staticmethod
+    def _is_domain(place):
+        return '.' in place and ' ' not in place
+
+    def _merge(self, idx, event, band_keys):
+        self.merged += 1
+        # Следующие варианты названия найдут запись и через корзины этого дубля
+        for key in band_keys:
+            self._buckets.setdefault(key, {}).setdefault(idx)
+
+        current = self.events[idx]
+        if richness(event) > richness(current):
+            # Новая карточка богаче — она становится основой
+            merge_into(event, current)
+            self.events[idx] = event
+            return event
+        merge_into(current, event)
+        return current
+
+
+def deduplicate(events, **settings):
+    """Список событий без дублей (порядок — по первому появлению)"""
+    dedup = Deduplicator(**settings)
+    for event in events:
+        dedup.add(event)
+    if dedup.merged:
+        logger.info(f"[Dedup] Склеено дублей: {dedup.merged}, осталось {len(dedup.events)}")
+    return dedup.events
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Модель события: компактный объект со слотами и заранее разобранными полями
+(дата — unix-время, цена — числа, место — интернированная строка)
+"""
+
+import hashlib
+import re
+import sys
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from enum import Enum
+from typing import Optional, Tuple
+
+_FREE_RE = re.compile(r'бесплатн|свободный вход|вход свободный|free', re.I)
+_AGE_RE = re.compile(r'\b\d{1,2}\+')
+# Число с разрядами через пробел («1 500», «12 000»); «500 1500» — два числа, а не 5001500
+_NUMBER_RE = re.compile(r'\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?!\d)|\d+')
+
+
+def parse_price(text):
+    """Цена из свободного текста: (минимум, максимум) в рублях или (None, None)"""
+    if text is None:
+        return None, None
+    if isinstance(text, (int, float)):
+        return float(text), float(text)
+
+    # Возрастной ценз (6+, 18+) ценой не считаем
+    text = _AGE_RE.sub(' ', str(text))
+    numbers = [float(re.sub(r'\s', '', n)) for n in _NUMBER_RE.findall(text)]
+    if not numbers:
+        # «Бесплатно» без единой суммы; «вход бесплатный, экскурсия 500 руб» — платное
+        return (0.0, 0.0) if _FREE_RE.search(text) else (None, None)
+    return min(numbers), max(numbers)
+
+
+class EventSource(str, Enum):
+    KUDAGO = 'KudaGo'
+    YANDEX = 'Яндекс.Афиша'
+    VENUE = 'Сайты площадок'
+
+
+@dataclass(slots=True)
+class Event:
+    title: str
+    source: EventSource
+    description: str = ''
+    # Начало события в unix-времени; None — дата неизвестна (Яндекс, сайты площадок)
+    start: Optional[int] = None
+    place: str = ''
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    price_text: str = ''
+    url: str = ''
+    source_id: Optional[str] = None
+    images: Tuple[str, ...] = ()
+    # Дата публикации в источнике (unix-время) — для инкрементального сбора
+    published: Optional[int] = None
+    # (широта, долгота) площадки или города, для которого событие собрано
+    coords: Optional[Tuple[float, float]] = None
+
+    # Заполняется AI фильтрацией
+    quality: Optional[int] = None
+    ai_summary: str = ''
+    is_relevant: bool = True
+
+    def __post_init__(self):
+        # Одни и те же площадки повторяются сотнями — храним одну копию строки
+        if self.place:
+            self.place = sys.intern(self.place)
+        if self.price_min is None and self.price_text:
+            self.price_min, self.price_max = parse_price(self.price_text)
+
+    @property
+    def date(self):
+        """Дата в формате DD.MM.YYYY (или пустая строка)"""
+        return datetime.fromtimestamp(self.start).strftime('%d.%m.%Y') if self.start else ''
+
+    @property
+    def time(self):
+        """Время начала HH:MM (или пустая строка)"""
+        return datetime.fromtimestamp(self.start).strftime('%H:%M') if self.start else ''
+
+    @property
+    def uid(self):
+        """Стабильный идентификатор: id в источнике или хэш названия и ссылки"""
+        if self.source_id:
+            return f"{self.source.name}:{self.source_id}"
+        digest = hashlib.sha1(f"{self.title}|{self.url}".encode('utf-8')).hexdigest()[:16]
+        return f"{self.source.name}:#{digest}"
+
+    @property
+    def is_free(self):
+        return self.price_max == 0
+
+    @property
+    def price_label(self):
+        """Цена для публикации"""
+        if self.price_text:
+            return self.price_text
+        return 'Бесплатно' if self.is_free else 'Цена не указана'
+
+    def sort_key(self):
+        """Сортировка по дате; события без даты — в конце"""
+        return (self.start is None, self.start or 0)
+
+    def to_dict(self):
+        data = asdict(self)
+        data['source'] = self.source.value
+        data['images'] = list(self.images)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['source'] = EventSource(data['source'])
+        data['images'] = tuple(data.get('images') or ())
+        data['coords'] = tuple(data['coords']) if data.get('coords') else None
+        return cls(**data)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Индекс событий в памяти: один собранный набор обслуживает любые подборки и периоды
+Даты — отсортированный массив для bisect, цена — корзины, источник и место — множества позиций
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import islice
+from typing import FrozenSet, Optional
+
+from processor.event import EventSource
+
+# Нижние границы ценовых корзин (руб); корзина 0 — бесплатные
+PRICE_BOUNDS = (0, 1, 500, 1000, 2000, 5000)
+UNKNOWN_PRICE = -1
+
+
+def price_bucket(price_min):
+    if price_min is None:
+        return UNKNOWN_PRICE
+    return bisect_right(PRICE_BOUNDS, price_min) - 1
+
+
+@dataclass(frozen=True)
+class Query:
+    """Скомпилированная подборка"""
+    start: Optional[int] = None
+    end: Optional[int] = None
+    is_free: bool = False
+    max_price: Optional[float] = None
+    sources: Optional[FrozenSet[EventSource]] = None
+    places: Optional[FrozenSet[str]] = None
+    # События без даты (Яндекс, площадки) идут после датированных
+    include_undated: bool = True
+    max_count: Optional[int] = None
+
+    def matches(self, event):
+        """Проверка одного события — для потоковой раздачи без индекса"""
+        if event.start is None:
+            if not self.include_undated:
+                return False
+        elif (self.start is not None and event.start < self.start) or (self.end is not None and event.start > self.end):
+            return False
+        if event.price_min is not None:
+            if self.is_free and event.price_min > 0:
+                return False
+            if self.max_price is not None and event.price_min > self.max_price:
+                return False
+        if self.sources is not None and event.source not in self.sources:
+            return False
+        return self.places is None or event.place in self.places
+
+
+def compile_collection(collection, window=None):
+    """Подборка из config.yaml -> Query; window — (начало, конец) периода в unix-времени"""
+    start, end = window or (None, None)
+    sources = collection.get('sources')
+    places = collection.get('places')
+    return Query(
+        start=int(start) if start is not None else None,
+        end=int(end) if end is not None else None,
+        is_free=bool(collection.get('is_free')),
+        max_price=collection.get('max_price'),
+        sources=frozenset(EventSource(s) for s in sources) if sources else None,
+        places=frozenset(places) if places else None,
+        include_undated=collection.get('include_undated', True),
+        max_count=collection.get('max_count', 10),
+    )
+
+
+class EventIndex:
+    def __init__(self, events):
+        dated = sorted((e for e in events if e.start is not None), key=lambda e: e.start)
+        undated = [e for e in events if e.start is None]
+        # Позиции: сначала датированные по времени, потом без даты — как Event.sort_key
+        self.events = dated + undated
+        self.starts = [e.start for e in dated]
+
+        self.by_price = {}
+        self.by_source = {}
+        self.by_place = {}
+        for pos, event in enumerate(self.events):
+            self.by_price.setdefault(price_bucket(event.price_min), []).append(pos)
+            self.by_source.setdefault(event.source, set()).add(pos)
+            if event.place:
+                self.by_place.setdefault(event.place, set()).add(pos)
+
+    def __len__(self):
+        return len(self.events)
+
+    def query(self, query):
+        """События подборки в порядке начала (не больше query.max_count)"""
+        lo, hi = self._time_range(query)
+        dated_end = len(self.starts)
+
+        # Каждая подходящая ценовая корзина — уже отсортированный список позиций:
+        # берём из неё только срез периода (и хвост без даты) и сливаем потоки
+        streams = []
+        for bucket, positions in self.by_price.items():
+            if not self._bucket_allowed(bucket, query):
+                continue
+            streams.append(self._slice(positions, lo, hi))
+            if query.include_undated:
+                streams.append(self._slice(positions, dated_end, len(self.events)))
+
+        sources = self._positions(self.by_source, query.sources)
+        places = self._positions(self.by_place, query.places)
+        matches = (
+            pos for pos in heapq.merge(*streams)
+            if self._price_fits(pos, query)
+            and (sources is None or pos in sources)
+            and (places is None or pos in places)
+        )
+        return [self.events[pos] for pos in islice(matches, query.max_count)]
+
+    def _time_range(self, query):
+        """Позиции [lo, hi) датированных событий периода"""
+        lo = bisect_left(self.starts, query.start) if query.start is not None else 0
+        hi = bisect_right(self.starts, query.end) if query.end is not None else len(self.starts)
+        return lo, hi
+
+    @staticmethod
+    def _slice(positions, lo, hi):
+        """Позиции из [lo, hi) без копирования списка"""
+        first, last = bisect_left(positions, lo), bisect_left(positions, hi)
+        return (positions[i] for i in range(first, last))
+
+    def _bucket_allowed(self, bucket, query):
+        if bucket == UNKNOWN_PRICE:
+            # Цена не указана — не исключаем (как Prefilter._price_violation)
+            return True
+        if query.is_free and PRICE_BOUNDS[bucket] > 0:
+            return False
+        if query.max_price is not None and PRICE_BOUNDS[bucket] > query.max_price:
+            return False
+        return True
+
+    def _price_fits(self, pos, query):
+        # Граница корзины не совпадает с max_price — на краю проверяем точно
+        if query.max_price is None:
+            return True
+        price_min = self.events[pos].price_min
+        return price_min is None or price_min <= query.max_price
+
+    @staticmethod
+    def _positions(postings, keys):
+        if keys is None:
+            return None
+        if len(keys) == 1:
+            return postings.get(next(iter(keys)), set())
+        return set().union(*(postings.get(key, ()) for key in keys))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Города территорий: коды источников и координаты, фильтр событий по радиусу
+Координаты городов заданы заранее, координаты площадок запоминаются из ответов
+KudaGo — расстояние считается один раз на площадку, без геокодирования событий
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import asin, cos, radians, sin, sqrt
+from typing import Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+
+@dataclass(frozen=True)
+class City:
+    name: str
+    # Код города в KudaGo (location); None — KudaGo этот город не покрывает
+    kudago: Optional[str]
+    # Путь города на afisha.yandex.ru
+    yandex: str
+    coords: Tuple[float, float]
+
+
+_CITIES = [
+    City('Москва', 'msk', 'moscow', (55.7558, 37.6173)),
+    City('Санкт-Петербург', 'spb', 'saint-petersburg', (59.9343, 30.3351)),
+    City('Екатеринбург', 'ekb', 'yekaterinburg', (56.8389, 60.6057)),
+    City('Новосибирск', 'nsk', 'novosibirsk', (55.0084, 82.9357)),
+    City('Нижний Новгород', 'nnv', 'nizhny-novgorod', (56.3269, 44.0059)),
+    City('Казань', 'kzn', 'kazan', (55.7961, 49.1064)),
+    City('Самара', 'smr', 'samara', (53.1959, 50.1002)),
+    City('Уфа', 'ufa', 'ufa', (54.7388, 55.9721)),
+    City('Красноярск', 'krasnoyarsk', 'krasnoyarsk', (56.0153, 92.8932)),
+    City('Краснодар', 'krd', 'krasnodar', (45.0355, 38.9753)),
+    City('Сочи', 'sochi', 'sochi', (43.5855, 39.7231)),
+    City('Выборг', 'vbg', 'vyborg', (60.7096, 28.7490)),
+    City('Ярославль', None, 'yaroslavl', (57.6261, 39.8845)),
+    City('Тверь', None, 'tver', (56.8587, 35.9176)),
+    City('Владивосток', None, 'vladivostok', (43.1155, 131.8855)),
+    City('Петропавловск-Камчатский', None, 'petropavlovsk-kamchatsky', (53.0452, 158.6483)),
+]
+CITIES = {city.name.lower().replace('ё', 'е'): city for city in _CITIES}
+
+# (код города KudaGo, площадка) -> координаты из ответов источников; площадки повторяются
+# сотнями, а одноимённые («Филармония») есть в разных городах. LRU: демон работает неделями
+MAX_PLACES = 10_000
+_places = OrderedDict()
+_places_lock = threading.Lock()
+
+
+class UnknownCity(ValueError):
+    """Города нет в справочнике: молча подставлять Москву нельзя"""
+
+
+def resolve_city(name):
+    city = CITIES.get(name.strip().lower().replace('ё', 'е'))
+    if city is None:
+        raise UnknownCity(f"Неизвестный город: {name} (добавьте его в scraper/geo.py)")
+    return city
+
+
+def territory_cities(territory):
+    """Города территории из config.yaml (cities, иначе name)"""
+    return tuple(dict.fromkeys(resolve_city(name) for name in territory.get('cities') or [territory['name']]))
+
+
+def remember_place(city, place, coords):
+    if not (city and place and coords):
+        return
+    key = (city, place)
+    with _places_lock:
+        if key in _places:
+            _places.move_to_end(key)
+            return
+        _places[key] = coords
+        if len(_places) > MAX_PLACES:
+            _places.popitem(last=False)
+
+
+def place_coords(city, place):
+    key = (city, place)
+    with _places_lock:
+        coords = _places.get(key)
+        if coords is not None:
+            _places.move_to_end(key)
+        return coords
+
+
+def distance_km(a, b):
+    """Расстояние по большому кругу (формула гаверсинусов)"""
+    lat1, lon1, lat2, lon2 = map(radians, (*a, *b))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(h))
+
+
+class GeoFilter:
+    """Оставляет события не дальше radius_km от любого города территории"""
+
+    def __init__(self, cities, radius_km=None):
+        self.centers = [city.coords for city in cities]
+        self.kudago_codes = [city.kudago for city in cities if city.kudago]
+        self.radius_km = radius_km
+        # Координаты -> внутри ли радиуса: на одну площадку считаем один раз
+        self._inside = {}
+        self.rejected = 0
+
+    @classmethod
+    def for_territory(cls, territory):
+        return cls(territory_cities(territory), territory.get('search_radius_km'))
+
+    def accepts(self, event):
+        if not self.radius_km:
+            return True
+        coords = event.coords or self._place_coords(event.place)
+        if coords is None:
+            # Без координат (сайты площадок) — не отбрасываем
+            return True
+        inside = self._inside.get(coords)
+        if inside is None:
+            inside = any(distance_km(coords, center) <= self.radius_km for center in self.centers)
+            self._inside[coords] = inside
+        if not inside:
+            self.rejected += 1
+        return inside
+
+    def _place_coords(self, place):
+        if not place:
+            return None
+        for code in self.kudago_codes:
+            coords = place_coords(code, place)
+            if coords is not None:
+                return coords
+        return None
+
+    def apply(self, events):
+        return [event for event in events if self.accepts(event)]
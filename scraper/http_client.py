@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Общий HTTP клиент: keep-alive пулы соединений + повторы с backoff
+(используется скрапером, AI анализатором и публикацией)
+"""
+
+import random
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Статусы, на которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Повтор этих методов не меняет результата; POST после таймаута мог уже выполниться (и списать деньги)
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class HttpClient:
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=3,
+                 backoff_factor=0.5, backoff_max=30, retry_after_max=120, timeout=10, cache=None):
+        # pool_connections — сколько хостов держим в пуле, pool_maxsize — соединений на хост
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.timeout = timeout
+        # Дисковый кэш ответов (data.http_cache.HttpCache), используется только для GET с use_cache=True
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, use_cache=False, **kwargs):
+        if not (use_cache and self.cache):
+            return self.request('GET', url, **kwargs)
+
+        key = self.cache.make_key(url, kwargs.get('params'))
+        entry = self.cache.get(key)
+        if entry is not None and entry.is_fresh(self.cache.ttl):
+            self.cache.record('hits')
+            metrics.count('http.cache.hit')
+            return entry.to_response()
+
+        # Устаревшую запись ревалидируем условным GET
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self.request('GET', url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.record('revalidated')
+            metrics.count('http.cache.revalidated')
+            self.cache.touch(key)
+            return entry.to_response()
+
+        self.cache.record('misses')
+        metrics.count('http.cache.miss')
+        if response.status_code == 200:
+            self.cache.put(key, response)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, retries=None, retry_unsafe=False, deadline=None, **kwargs):
+        """Запрос с повторами на 429/5xx и сетевых ошибках.
+
+        Неидемпотентные методы (POST) повторяются только на 429 — запрос не выполнен;
+        retry_unsafe=True разрешает повтор и после таймаута, сетевой ошибки и 5xx.
+        deadline — time.monotonic(), к которому вызывающему нужен ответ: таймаут запроса
+        и паузы между попытками не выходят за него (не успеваем — отдаём, что есть).
+        """
+        retries = self.max_retries if retries is None else retries
+        kwargs.setdefault('timeout', self.timeout)
+        safe = retry_unsafe or method.upper() in IDEMPOTENT_METHODS
+        timeout = kwargs['timeout']
+
+        for attempt in range(retries + 1):
+            if deadline is not None:
+                kwargs['timeout'] = self._within(timeout, deadline)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries or not safe:
+                    raise
+                delay = self._backoff(attempt)
+                if not self._fits(delay, deadline):
+                    raise
+                metrics.count('http.retry')
+                logger.warning(f"[HTTP] {method} {url}: {e}, повтор через {delay:.1f}с")
+            else:
+                if response.status_code == 429:
+                    metrics.count('http.429')
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                if response.status_code != 429 and not safe:
+                    return response
+                retry_after = self._retry_after(response)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if not self._fits(delay, deadline):
+                    return response
+                metrics.count('http.retry')
+                logger.warning(f"[HTTP] {method} {url}: HTTP {response.status_code}, повтор через {delay:.1f}с")
+
+            time.sleep(delay)
+
+    @staticmethod
+    def _within(timeout, deadline):
+        """Таймаут запроса, урезанный до оставшегося времени (не меньше 0.1с)"""
+        remaining = max(deadline - time.monotonic(), 0.1)
+        if isinstance(timeout, tuple):
+            return tuple(min(t, remaining) if t is not None else remaining for t in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @staticmethod
+    def _fits(delay, deadline):
+        """После паузы ещё останется время на попытку"""
+        return deadline is None or time.monotonic() + delay < deadline
+
+    def _backoff(self, attempt):
+        """Экспоненциальная задержка с полным джиттером"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """Задержка из заголовка Retry-After (секунды или HTTP-дата)"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+
+        return min(max(delay, 0), self.retry_after_max)
+
+    def close(self):
+        """Закрыть соединения и кэш (время чтения кэша уходит на диск); повторный вызов безвреден"""
+        self.session.close()
+        # Клиент закрывают и Runtime.close, и следующий configure_http_client
+        cache, self.cache = self.cache, None
+        if cache is not None:
+            cache.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Общий на весь процесс клиент (создаётся при первом обращении)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def configure_http_client(settings=None):
+    """Пересоздать общий клиент с настройками из секции http в config.yaml"""
+    global _client
+    settings = dict(settings or {})
+    cache_settings = settings.pop('cache', None)
+    cache = None
+    if cache_settings and cache_settings.get('enabled', True):
+        from data.http_cache import HttpCache
+        cache = HttpCache(**{k: v for k, v in cache_settings.items() if k != 'enabled'})
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(cache=cache, **settings)
+    return _client
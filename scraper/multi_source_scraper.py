@@ -5,143 +5,280 @@
 С ЖЁСТКОЙ ФИЛЬТРАЦИЕЙ ПО ДАТЕ
 """
 
-import requests
-from bs4 import BeautifulSoup
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
+from itertools import islice
 import logging
-import re
+import time
+
+from logs.metrics import metrics
+from processor.dedup import deduplicate
+from processor.event import Event, EventSource
+from scraper.geo import GeoFilter, remember_place, territory_cities
+from scraper.http_client import get_http_client
+from scraper.sources import ScrapeRequest, CircuitBreakers, SourceError, build_sources
 
 logger = logging.getLogger(__name__)
 
+KUDAGO_EVENTS_URL = "https://kudago.com/public-api/v1.4/events/"
+
+
+
 class MultiSourceEventScraper:
-    def __init__(self):
+    def __init__(self, max_workers=8, deadline=30, sources=None, breaker_state=None, paginate=False, kudago_prefetch=4, http_client=None, parser=None, kudago_url=KUDAGO_EVENTS_URL):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         }
+        self.timeout = 10
+        self.http = http_client or get_http_client()
+        # Разбор HTML: большие страницы площадок уходят в пул процессов (см. parser)
+        self._parser = parser
+        # Параллельный режим: общий дедлайн сбора (сек)
+        self.max_workers = max_workers
+        self.deadline = deadline
+        # Источники из config.yaml (scraper/sources.py): таймаут, параллельность, предохранитель
+        self.sources = build_sources(sources)
+        self.breakers = CircuitBreakers(breaker_state)
+        # KudaGo: обходить все страницы и сколько страниц качать заранее
+        self.paginate = paginate
+        self.kudago_prefetch = kudago_prefetch
+        self.kudago_url = kudago_url
+    
+    @property
+    def parser(self):
+        """Разборщик HTML; bs4 и пул процессов поднимаются только для Яндекса и площадок"""
+        if self._parser is None:
+            from scraper.parsing import PageParser
+            self._parser = PageParser()
+        return self._parser
     
-    def scrape_kudago(self, city_slug, time_range='week'):
-        """KudaGo API С ЖЁСТКОЙ ФИЛЬТРАЦИЕЙ ПО ДАТЕ"""
+    def scrape_kudago(self, city_slug, time_range='week', timeout=None, paginate=None, published_after=None, coords=None, deadline=None):
+        """KudaGo API С ЖЁСТКОЙ ФИЛЬТРАЦИЕЙ ПО ДАТЕ
+        
+        published_after — unix-время: вернуть только опубликованное позже (дельта)
+        coords — координаты города: для событий, у площадки которых их нет
+        deadline — time.monotonic(), после которого повторы запросов бессмысленны
+        None — KudaGo не ответил (ошибка, а не пустой список: предохранитель и отметка
+        инкрементального сбора должны это видеть)
+        """
+        if paginate is None:
+            paginate = self.paginate
+        
         try:
-            now = datetime.now()
-            
-            # Определяем временной диапазон
-            if time_range == 'today':
-                start_date = now
-                end_date = now + timedelta(days=1)
-            elif time_range == 'tomorrow':
-                start_date = now + timedelta(days=1)
-                end_date = now + timedelta(days=2)
-            elif time_range == 'week':
-                start_date = now
-                end_date = now + timedelta(days=7)
-            elif time_range == 'month':
-                start_date = now
-                end_date = now + timedelta(days=30)
+            if paginate:
+                # Все страницы API, а не только первая сотня
+                formatted = list(self.iter_kudago(city_slug, time_range, timeout=timeout, published_after=published_after, coords=coords, deadline=deadline))
             else:
-                start_date = now
-                end_date = now + timedelta(days=7)
-            
-            start_ts = int(start_date.timestamp())
-            end_ts = int(end_date.timestamp())
-            
-            url = "https://kudago.com/public-api/v1.4/events/"
-            params = {
-                'location': city_slug,
-                'page_size': 100,
-                'fields': 'id,title,description,place,dates,price,site_url,images',
-                'actual_since': start_ts,
-                'actual_until': end_ts,
-                'order_by': '-publication_date'
-            }
-            
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            
-            if response.status_code == 200:
-                events = response.json().get('results', [])
-                formatted = []
+                now, start_date, end_date = self.time_window(time_range)
+                params = self._kudago_params(city_slug, start_date, end_date)
                 
-                for e in events:
-                    if not e.get('dates'):
-                        continue
-                    
-                    dates = e.get('dates', [])
-                    if not dates:
-                        continue
-                    
-                    first_date = dates[0]
-                    start_event_ts = first_date.get('start')
-                    
-                    if not start_event_ts:
-                        continue
-                    
-                    event_date = datetime.fromtimestamp(start_event_ts)
-                    
-                    # 🔥 ЖЁСТКАЯ ФИЛЬТРАЦИЯ ПО ДАТЕ
-                    # Пропускаем события старше чем 1 день назад
-                    if event_date < now - timedelta(days=1):
-                        logger.info(f"[KudaGo] Пропускаю старое событие: {e.get('title', '')} ({event_date.strftime('%Y-%m-%d')})")
-                        continue
-                    
-                    # Пропускаем события за пределами диапазона
-                    if event_date > end_date:
-                        continue
-                    
-                    place_info = e.get('place', {})
-                    place_name = place_info.get('title', 'Не указано') if place_info else 'Не указано'
-                    
-                    formatted.append({
-                        'title': e.get('title', ''),
-                        'description': e.get('description', ''),
-                        'date': event_date.strftime('%d.%m.%Y'),
-                        'time': event_date.strftime('%H:%M'),
-                        'place': place_name,
-                        'price': e.get('price', 'Бесплатно'),
-                        'url': e.get('site_url', ''),
-                        'source': 'KudaGo',
-                        'timestamp': start_event_ts
-                    })
+                response = self.http.get(self.kudago_url, use_cache=True, params=params, headers=self.headers, timeout=timeout or self.timeout, deadline=deadline)
                 
-                # Сортируем по дате
-                formatted.sort(key=lambda x: x['timestamp'])
+                if response.status_code != 200:
+                    logger.warning(f"[KudaGo] {city_slug}: HTTP {response.status_code}")
+                    return None
                 
-                logger.info(f"[KudaGo] {len(formatted)} АКТУАЛЬНЫХ событий (после фильтрации)")
-                return formatted
+                formatted = self._format_kudago_page(response.json(), now, end_date, published_after, coords, city_slug)
             
-            return []
+            # Сортируем по дате
+            formatted.sort(key=Event.sort_key)
+            
+            logger.info(f"[KudaGo] {len(formatted)} АКТУАЛЬНЫХ событий (после фильтрации)")
+            return formatted
         except Exception as e:
             logger.error(f"[KudaGo] Ошибка: {e}")
-            return []
+            return None
+    
+    def iter_kudago(self, city_slug, time_range='week', prefetch=None, timeout=None, published_after=None, coords=None, deadline=None):
+        """Постраничный обход KudaGo: генератор отформатированных событий.
+        
+        Страницы скачиваются заранее (не больше prefetch одновременно) и отдаются
+        по порядку, так что обработка первой страницы начинается, пока качаются
+        следующие, а в памяти держится лишь окно из нескольких страниц.
+        Выдача отсортирована по дате публикации, поэтому с published_after обход
+        заканчивается на первой странице, где встречается уже виденное.
+        Недошедшая страница — исключение (SourceError): обрезанный обход не должен
+        выглядеть полным.
+        """
+        prefetch = prefetch or self.kudago_prefetch
+        timeout = timeout or self.timeout
+        now, start_date, end_date = self.time_window(time_range)
+        params = self._kudago_params(city_slug, start_date, end_date)
+        
+        first = self._fetch_kudago_page(self.kudago_url, params, timeout, deadline)
+        yield from self._format_kudago_page(first, now, end_date, published_after, coords, city_slug)
+        
+        count = first.get('count')
+        if not first.get('next') or self._reached_seen(first, published_after):
+            return
+        
+        if not count:
+            # Нет общего числа — просто идём по ссылкам next
+            next_url = first.get('next')
+            while next_url:
+                page = self._fetch_kudago_page(next_url, None, timeout, deadline)
+                yield from self._format_kudago_page(page, now, end_date, published_after, coords, city_slug)
+                if self._reached_seen(page, published_after):
+                    return
+                next_url = page.get('next')
+            return
+        
+        # Число страниц известно — качаем их параллельно с ограниченным окном
+        total_pages = -(-count // params['page_size'])
+        pages = iter(range(2, total_pages + 1))
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        window = deque()
+        try:
+            for page_num in islice(pages, prefetch):
+                window.append(executor.submit(self._fetch_kudago_page, self.kudago_url, {**params, 'page': page_num}, timeout, deadline))
+            
+            while window:
+                page = window.popleft().result()
+                if self._reached_seen(page, published_after):
+                    yield from self._format_kudago_page(page, now, end_date, published_after, coords, city_slug)
+                    break
+                for page_num in islice(pages, 1):
+                    window.append(executor.submit(self._fetch_kudago_page, self.kudago_url, {**params, 'page': page_num}, timeout, deadline))
+                yield from self._format_kudago_page(page, now, end_date, published_after, coords, city_slug)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _reached_seen(page, published_after):
+        """На странице есть события, опубликованные не позже отметки"""
+        if not published_after:
+            return False
+        return any((e.get('publication_date') or 0) <= published_after for e in page.get('results', []))
+    
+    def _fetch_kudago_page(self, url, params, timeout, deadline=None):
+        """Одна страница KudaGo API; не получена — SourceError"""
+        page = (params or {}).get('page', url)
+        try:
+            response = self.http.get(url, use_cache=True, params=params, headers=self.headers, timeout=timeout, deadline=deadline)
+        except Exception as e:
+            raise SourceError(f"KudaGo, страница {page}: {e}") from e
+        if response.status_code != 200:
+            raise SourceError(f"KudaGo, страница {page}: HTTP {response.status_code}")
+        return response.json()
+    
+    def time_window(self, time_range):
+        """Временной диапазон периода: (сейчас, начало, конец)"""
+        now = datetime.now()
+        
+        if time_range == 'today':
+            start_date = now
+            end_date = now + timedelta(days=1)
+        elif time_range == 'tomorrow':
+            start_date = now + timedelta(days=1)
+            end_date = now + timedelta(days=2)
+        elif time_range == 'week':
+            start_date = now
+            end_date = now + timedelta(days=7)
+        elif time_range == 'month':
+            start_date = now
+            end_date = now + timedelta(days=30)
+        else:
+            start_date = now
+            end_date = now + timedelta(days=7)
+        
+        return now, start_date, end_date
+    
+    def _kudago_params(self, city_slug, start_date, end_date):
+        # Границы округляем до часа, чтобы повторные запуски попадали в HTTP кэш;
+        # точная фильтрация по дате всё равно идёт в _format_kudago_page
+        start_hour = start_date.replace(minute=0, second=0, microsecond=0)
+        end_hour = end_date.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return {
+            'location': city_slug,
+            'page_size': 100,
+            'fields': 'id,publication_date,title,description,place,dates,price,is_free,site_url,images',
+            # Площадка целиком (название и координаты), а не только её id
+            'expand': 'place',
+            'actual_since': int(start_hour.timestamp()),
+            'actual_until': int(end_hour.timestamp()),
+            'order_by': '-publication_date'
+        }
+    
+    def _format_kudago_page(self, page, now, end_date, published_after=None, coords=None, city_slug=None):
+        """Отформатированные события одной страницы ответа (city_slug — код города KudaGo)"""
+        formatted = []
+        
+        for e in page.get('results', []):
+            if not e.get('dates'):
+                continue
+            
+            if published_after and (e.get('publication_date') or 0) <= published_after:
+                continue
+            
+            dates = e.get('dates', [])
+            if not dates:
+                continue
+            
+            first_date = dates[0]
+            start_event_ts = first_date.get('start')
+            
+            if not start_event_ts:
+                continue
+            
+            event_date = datetime.fromtimestamp(start_event_ts)
+            
+            # 🔥 ЖЁСТКАЯ ФИЛЬТРАЦИЯ ПО ДАТЕ
+            # Пропускаем события старше чем 1 день назад
+            if event_date < now - timedelta(days=1):
+                logger.info(f"[KudaGo] Пропускаю старое событие: {e.get('title', '')} ({event_date.strftime('%Y-%m-%d')})")
+                continue
+            
+            # Пропускаем события за пределами диапазона
+            if event_date > end_date:
+                continue
+            
+            place_info = e.get('place', {})
+            place_name = place_info.get('title', '') if place_info else ''
+            place_coords = (place_info or {}).get('coords') or {}
+            event_coords = coords
+            if place_coords.get('lat') is not None and place_coords.get('lon') is not None:
+                event_coords = (place_coords['lat'], place_coords['lon'])
+                remember_place(city_slug, place_name, event_coords)
+            
+            event = Event(
+                title=e.get('title', ''),
+                source=EventSource.KUDAGO,
+                description=e.get('description', ''),
+                start=int(start_event_ts),
+                place=place_name,
+                price_text=e.get('price') or '',
+                url=e.get('site_url', ''),
+                source_id=str(e['id']) if e.get('id') else None,
+                images=tuple(img['image'] for img in e.get('images') or [] if img.get('image')),
+                published=e.get('publication_date'),
+                coords=event_coords
+            )
+            if e.get('is_free'):
+                event.price_min = event.price_max = 0.0
+            formatted.append(event)
+        
+        return formatted
     
-    def scrape_yandex(self, city_name, time_range='week'):
-        """Яндекс.Афиша"""
+    def scrape_yandex(self, city_slug, time_range='week', timeout=None, coords=None, deadline=None):
+        """Яндекс.Афиша (city_slug — путь города на afisha.yandex.ru, см. scraper.geo)"""
         try:
-            url = f"https://afisha.yandex.ru/{city_name.lower()}/events/"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            url = f"https://afisha.yandex.ru/{city_slug}/events/"
+            response = self.http.get(url, use_cache=True, headers=self.headers, timeout=timeout or self.timeout, deadline=deadline)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                events = []
-                
-                event_cards = soup.find_all('div', class_='event-card')
-                for card in event_cards[:20]:
-                    try:
-                        title = card.find('h3')
-                        if not title:
-                            continue
-                        
-                        events.append({
-                            'title': title.get_text(strip=True)[:80],
-                            'description': '',
-                            'date': 'См. Яндекс',
-                            'time': '',
-                            'place': '',
-                            'price': '',
-                            'url': f"https://afisha.yandex.ru{card.find('a')['href']}",
-                            'source': 'Яндекс.Афиша',
-                            'timestamp': datetime.now().timestamp()
-                        })
-                    except:
-                        continue
+                events = [
+                    Event(
+                        title=item['title'],
+                        source=EventSource.YANDEX,
+                        url=f"https://afisha.yandex.ru{item['href']}",
+                        source_id=item['href'],
+                        coords=coords
+                    )
+                    for item in self.parser.parse('yandex', response.text)
+                ]
                 
                 logger.info(f"[Яндекс] {len(events)} событий")
                 return events
@@ -150,68 +287,252 @@ class MultiSourceEventScraper:
             logger.error(f"[Яндекс] Ошибка: {e}")
             return []
     
-    def scrape_venues(self, venue_urls):
+    def scrape_venues(self, venue_urls, timeout=None, deadline=None):
         """Сайты театров, клубов, парков"""
         all_events = []
         
         for venue_url in venue_urls:
             try:
-                response = requests.get(venue_url, headers=self.headers, timeout=10)
+                response = self.http.get(venue_url, use_cache=True, headers=self.headers, timeout=timeout or self.timeout, deadline=deadline)
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    event_elements = soup.find_all(['div', 'section'], class_=re.compile('event|афиша|program', re.I))
-                    
-                    for elem in event_elements[:10]:
-                        text = elem.get_text()
-                        all_events.append({
-                            'title': text[:100],
-                            'description': '',
-                            'date': 'На сайте',
-                            'time': '',
-                            'place': venue_url.split('/')[2],
-                            'price': '',
-                            'url': venue_url,
-                            'source': 'Сайты площадок',
-                            'timestamp': datetime.now().timestamp()
-                        })
+                    for text in self.parser.parse('venues', response.text):
+                        all_events.append(Event(
+                            title=text,
+                            source=EventSource.VENUE,
+                            place=venue_url.split('/')[2],
+                            url=venue_url
+                        ))
             except Exception as e:
                 logger.error(f"[Venues] {venue_url}: {e}")
         
         logger.info(f"[Venues] {len(all_events)} событий")
         return all_events
     
-    def scrape_all(self, city, time_range='week'):
-        """Собрать события со ВСЕХ источников С ФИЛЬТРАЦИЕЙ ПО ДАТЕ"""
-        all_events = []
+    def scrape_all(self, territory, time_range='week', concurrent=True, published_after=None, results=None):
+        """Собрать события территории со ВСЕХ источников С ФИЛЬТРАЦИЕЙ ПО ДАТЕ
+        
+        territory — секция territories из config.yaml: каждый город из cities опрашивается
+        отдельной задачей, события дальше search_radius_km от городов отбрасываются
+        published_after — отметка инкрементального сбора для KudaGo (см. data.event_store)
+        results — словарь для итогов задач (см. scraper.sources.complete_sources)
+        """
+        request = self._request(territory, time_range, published_after, results)
         
-        # KudaGo (с жёсткой фильтрацией)
-        city_slug = self._get_city_slug(city)
-        kudago_events = self.scrape_kudago(city_slug, time_range)
-        all_events.extend(kudago_events)
+        tasks = []
+        for source in self.sources:
+            for name, func in source.tasks(self, request):
+                if self.breakers.get(name, source).allow():
+                    tasks.append((name, source, func))
+                else:
+                    metrics.count(f"scrape.{source.name}.skipped")
+                    logger.info(f"[Scraper] {name}: отключён после повторных сбоев, пропускаю")
         
-        # Яндекс.Афиша
-        yandex_events = self.scrape_yandex(city, time_range)
-        all_events.extend(yandex_events)
+        if concurrent:
+            all_events = self._scrape_concurrent(tasks, request)
+        else:
+            all_events = []
+            for name, source, func in tasks:
+                try:
+                    with metrics.timer(f"scrape.{source.name}"):
+                        events = func(timeout=source.timeout, deadline=time.monotonic() + source.timeout)
+                except Exception as e:
+                    logger.error(f"[Scraper] {name}: {e}")
+                    events = None
+                self._record(name, source, request, len(events) if events is not None else None)
+                all_events.extend(events or [])
+        self.breakers.save()
         
-        # Сайты площадок (пример для Москвы)
-        if city.lower() in ['москва', 'msk']:
-            venues = [
-                'https://www.teatr-mayakovskogo.ru',
-                'https://www.bolshoi.ru',
-            ]
-            venue_events = self.scrape_venues(venues)
-            all_events.extend(venue_events)
+        # Одно и то же событие из разных источников — одна запись
+        metrics.count('dedup.in', len(all_events))
+        with metrics.timer('dedup'), metrics.profile('dedup'):
+            all_events = deduplicate(all_events)
+        metrics.count('dedup.out', len(all_events))
+        
+        geo = GeoFilter.for_territory(territory)
+        all_events = geo.apply(all_events)
+        if geo.rejected:
+            logger.info(f"[Scraper] Дальше {geo.radius_km} км от городов территории: {geo.rejected}")
         
         # Сортируем по дате
-        all_events.sort(key=lambda x: x['timestamp'], reverse=False)
+        all_events.sort(key=Event.sort_key)
         
         logger.info(f"✓ ИТОГО {len(all_events)} АКТУАЛЬНЫХ событий из множественных источников")
         return all_events
     
-    def _get_city_slug(self, city):
-        slugs = {
-            'москва': 'msk',
-            'ярославль': 'yaroslavl',
-            'тверь': 'tver'
+    def iter_all(self, territory, time_range='week', published_after=None, queue_size=256, results=None):
+        """Потоковый сбор: генератор событий всех источников по мере их получения.
+        
+        Источники опрашиваются параллельно и складывают события в общую очередь
+        ограниченного размера: если потребитель не успевает, источники ждут.
+        Закрытие генератора останавливает сбор. Дубли здесь не склеиваются —
+        это делает потребитель (processor.dedup.Deduplicator.add).
+        results — как в scrape_all; задачи, прерванные потребителем, в него не попадают.
+        Дедлайн (self.deadline) считается по времени, которое потребитель ждёт событий:
+        пока он сам занят, источники стоят на полной очереди и это им не засчитывается.
+        Когда дедлайн истёк, незавершённые задачи учитываются как сбой и сбор заканчивается.
+        """
+        request = self._request(territory, time_range, published_after, results)
+        geo = GeoFilter.for_territory(territory)
+        tasks = []
+        for source in self.sources:
+            for name, func in source.streams(self, request):
+                if self.breakers.get(name, source).allow():
+                    tasks.append((name, source, func))
+                else:
+                    metrics.count(f"scrape.{source.name}.skipped")
+                    logger.info(f"[Scraper] {name}: отключён после повторных сбоев, пропускаю")
+        
+        events = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        done = object()
+        # Незавершённые задачи; под замком решается, кто учтёт результат — задача или дедлайн
+        running = {name for name, _, _ in tasks}
+        running_lock = threading.Lock()
+        
+        def put(item):
+            while not stop.is_set():
+                try:
+                    events.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def run(name, source, func):
+            count, failed = 0, False
+            try:
+                with source.slots, metrics.timer(f"scrape.{source.name}"):
+                    for event in func(timeout=source.timeout):
+                        if not put(event):
+                            break
+                        count += 1
+            except Exception as e:
+                logger.error(f"[Scraper] {name}: {e}")
+                failed = True
+            finally:
+                with running_lock:
+                    running.discard(name)
+                    # Прерванный потребителем или дедлайном сбор здесь не учитываем
+                    finished = not stop.is_set()
+                if finished:
+                    self._record(name, source, request, None if failed else count)
+                put(done)
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for task in tasks:
+            executor.submit(run, *task)
+        
+        try:
+            remaining = len(tasks)
+            budget = self.deadline
+            while remaining:
+                waited_from = time.monotonic()
+                try:
+                    item = events.get(timeout=max(budget, 0))
+                except queue.Empty:
+                    with running_lock:
+                        stop.set()
+                        unfinished = [(name, source) for name, source, _ in tasks if name in running]
+                    names = ', '.join(name for name, _ in unfinished)
+                    logger.warning(f"[Scraper] Общий дедлайн {self.deadline}с истёк, не дождались: {names}")
+                    for name, source in unfinished:
+                        self._record(name, source, request, None)
+                    break
+                budget -= time.monotonic() - waited_from
+                if item is done:
+                    remaining -= 1
+                    continue
+                if geo.accepts(item):
+                    yield item
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.breakers.save()
+    
+    @staticmethod
+    def _request(territory, time_range, published_after, results=None):
+        # Неизвестный город — ошибка (scraper.geo.UnknownCity), а не молчаливая Москва
+        return ScrapeRequest(territory_cities(territory), time_range, published_after,
+                             tuple(territory.get('venues') or ()), {} if results is None else results)
+    
+    def _record(self, name, source, request, count):
+        """Учесть результат задачи в предохранителе (count None — ошибка или таймаут)"""
+        breaker = self.breakers.get(name, source)
+        request.results[name] = (source, count)
+        metrics.count(f"scrape.{source.name}.events", count or 0)
+        if source.is_failure(count, request):
+            metrics.count(f"scrape.{source.name}.failures")
+            if breaker.record_failure():
+                logger.warning(f"[Scraper] {name}: {breaker.failures} сбоев подряд, пауза {source.cooldown}с")
+        else:
+            breaker.record_success()
+    
+    def _scrape_concurrent(self, tasks, request):
+        """Параллельный опрос всех источников: возвращает то, что успело прийти до дедлайна"""
+        started = {}
+        deadline_at = time.monotonic() + self.deadline
+        
+        def run(name, source, func):
+            # Не больше concurrency одновременных задач одного источника
+            with source.slots:
+                started[name] = time.monotonic()
+                # Повторы запросов не переживают ни таймаут источника, ни общий дедлайн
+                deadline = min(started[name] + source.timeout, deadline_at)
+                with metrics.timer(f"scrape.{source.name}"):
+                    return func(timeout=source.timeout, deadline=deadline)
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {
+            executor.submit(run, name, source, func): (name, source)
+            for name, source, func in tasks
         }
-        return slugs.get(city.lower(), 'msk')
+        
+        all_events = []
+        pending = set(futures)
+        
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    names = ', '.join(futures[f][0] for f in pending)
+                    logger.warning(f"[Scraper] Общий дедлайн {self.deadline}с истёк, не дождались: {names}")
+                    for future in pending:
+                        self._record(*futures[future], request, None)
+                    break
+                
+                # Источники, превысившие собственный таймаут, больше не ждём
+                wait_until = deadline_at
+                for future in list(pending):
+                    name, source = futures[future]
+                    if name not in started:
+                        continue
+                    source_deadline = started[name] + source.timeout
+                    if now >= source_deadline:
+                        logger.warning(f"[Scraper] {name}: таймаут {source.timeout}с, пропускаю")
+                        pending.discard(future)
+                        self._record(name, source, request, None)
+                    else:
+                        wait_until = min(wait_until, source_deadline)
+                
+                if not pending:
+                    break
+                
+                done, pending = wait(pending, timeout=max(wait_until - now, 0.05), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, source = futures[future]
+                    try:
+                        events = future.result()
+                    except Exception as e:
+                        logger.error(f"[Scraper] {name}: {e}")
+                        events = None
+                    self._record(name, source, request, len(events) if events is not None else None)
+                    all_events.extend(events or [])
+        finally:
+            # Не ждём зависшие запросы — их результаты уже не нужны
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return all_events
+    
+    def close(self):
+        if self._parser is not None:
+            self._parser.close()
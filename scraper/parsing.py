@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Разбор HTML страниц источников
+Разбирается только нужное поддерево (SoupStrainer), парсер lxml если установлен,
+большие страницы — в отдельном процессе, чтобы не упираться в GIL
+"""
+
+import multiprocessing
+import re
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+# Селекторы источников собираются один раз при импорте
+_VENUE_CLASS_RE = re.compile('event|афиша|program', re.I)
+# SoupStrainer сверяет атрибут class целиком ("event-card active"), поэтому класс ищем по слову
+_YANDEX_CARD_RE = re.compile(r'(?:^|\s)event-card(?:\s|$)')
+
+SELECTORS = {
+    'yandex': {
+        'strainer': SoupStrainer('div', attrs={'class': _YANDEX_CARD_RE}),
+        'cards': ('div', {'class_': 'event-card'}),
+        'limit': 20,
+    },
+    'venues': {
+        'strainer': SoupStrainer(['div', 'section'], attrs={'class': _VENUE_CLASS_RE}),
+        'cards': (['div', 'section'], {'class_': _VENUE_CLASS_RE}),
+        'limit': 10,
+    },
+}
+
+
+def _cards(source, html):
+    selector = SELECTORS[source]
+    soup = BeautifulSoup(html, PARSER, parse_only=selector['strainer'])
+    name, attrs = selector['cards']
+    return soup.find_all(name, limit=selector['limit'], **attrs)
+
+
+def parse_yandex(html):
+    """Карточки Яндекс.Афиши: [{'title', 'href'}]"""
+    items = []
+    for card in _cards('yandex', html):
+        title = card.find('h3')
+        link = card.find('a', href=True)
+        if not title or not link:
+            continue
+        items.append({'title': title.get_text(strip=True)[:80], 'href': link['href']})
+    return items
+
+
+def parse_venue(html):
+    """Блоки афиши на сайте площадки: [текст блока]"""
+    return [card.get_text()[:100] for card in _cards('venues', html)]
+
+
+PARSERS = {
+    'yandex': parse_yandex,
+    'venues': parse_venue,
+}
+
+
+class PageParser:
+    """Маленькие страницы разбираются в текущем потоке, большие — в пуле процессов"""
+
+    def __init__(self, workers=2, inline_below=100_000):
+        self.workers = workers
+        self.inline_below = inline_below
+        self._pool = None
+        # Пул создают задачи площадок из нескольких потоков скрапера сразу
+        self._pool_lock = threading.Lock()
+
+    def parse(self, source, html):
+        with metrics.timer(f"parse.{source}"):
+            return self._parse(source, html)
+
+    def _parse(self, source, html):
+        parser = PARSERS[source]
+        if self.workers <= 0 or len(html) < self.inline_below:
+            with metrics.profile('parse'):
+                return parser(html)
+        try:
+            return self._get_pool().submit(parser, html).result()
+        except Exception as e:
+            # Пул процессов недоступен (ограничения окружения) — разбираем здесь
+            logger.warning(f"[Parser] Пул процессов: {e}, разбираю в потоке")
+            return parser(html)
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: форк процесса с работающими потоками скрапера небезопасен
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
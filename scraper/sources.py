@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Реестр источников событий и предохранители (circuit breaker)
+Источники включаются и настраиваются в config.yaml (секция sources)
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from processor.event import EventSource
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TYPES = {}
+
+
+def register(name):
+    """Декоратор: зарегистрировать класс источника под именем типа"""
+    def decorator(cls):
+        cls.type_name = name
+        SOURCE_TYPES[name] = cls
+        return cls
+    return decorator
+
+
+class SourceError(RuntimeError):
+    """Источник не ответил (HTTP ошибка, недошедшая страница): задача — сбой, а не пустой ответ"""
+
+
+@dataclass
+class ScrapeRequest:
+    """Что собирать: города территории (scraper.geo.City), период и отметка инкрементального сбора"""
+    cities: Tuple
+    time_range: str = 'week'
+    published_after: Optional[int] = None
+    venues: Tuple[str, ...] = field(default_factory=tuple)
+    # Итоги задач: имя задачи -> (источник, число событий или None при ошибке и таймауте)
+    results: Dict = field(default_factory=dict)
+
+
+def complete_sources(results):
+    """Значения EventSource, все задачи которых завершились без ошибки и таймаута"""
+    sources = {source.event_source.value for source, _ in results.values()}
+    failed = {source.event_source.value for source, count in results.values() if count is None}
+    return sources - failed
+
+
+class Source(ABC):
+    """Базовый источник: задачи сбора, таймаут, лимит параллельности, предохранитель"""
+    type_name = None
+    # Какие события (processor.event.EventSource) даёт источник
+    event_source = None
+    defaults = {
+        'enabled': True,
+        'timeout': 10,
+        'concurrency': 4,
+        'failure_threshold': 3,
+        'cooldown': 1800,
+        # Пустой ответ считать сбоем (сломанный селектор тоже стоит нам таймаута)
+        'empty_is_failure': True,
+    }
+
+    def __init__(self, name, settings=None):
+        settings = {**self.defaults, **(settings or {})}
+        self.name = name
+        self.enabled = settings['enabled']
+        self.timeout = settings['timeout']
+        self.failure_threshold = settings['failure_threshold']
+        self.cooldown = settings['cooldown']
+        self.empty_is_failure = settings['empty_is_failure']
+        self.slots = threading.BoundedSemaphore(settings['concurrency'])
+
+    @abstractmethod
+    def tasks(self, scraper, request):
+        """[(имя задачи, функция(timeout, deadline) -> список Event)]"""
+
+    def streams(self, scraper, request):
+        """Как tasks(), но функция может отдавать события по мере получения (итератор)"""
+        return self.tasks(scraper, request)
+
+    def is_failure(self, count, request):
+        """count — сколько событий пришло; None — ошибка или таймаут, 0 — по настройке empty_is_failure"""
+        return count is None or (not count and self.empty_is_failure)
+
+
+@register('kudago')
+class KudaGoSource(Source):
+    event_source = EventSource.KUDAGO
+    # Ответ API без событий — не поломка: в маленьком городе на завтра может не быть ничего
+    defaults = {**Source.defaults, 'empty_is_failure': False}
+
+    def tasks(self, scraper, request):
+        return self._per_city(scraper.scrape_kudago, request)
+
+    def streams(self, scraper, request):
+        # Постраничный генератор: первая страница уходит дальше, пока качаются следующие
+        return self._per_city(scraper.iter_kudago, request)
+
+    def _per_city(self, method, request):
+        # Города, которых KudaGo не покрывает, просто не опрашиваем
+        return [
+            (f"{self.name}:{city.kudago}", partial(method, city.kudago, request.time_range,
+                                                   published_after=request.published_after, coords=city.coords))
+            for city in request.cities if city.kudago
+        ]
+
+    def is_failure(self, count, request):
+        # При дельта-сборе новых публикаций может и не быть
+        if request.published_after and count is not None:
+            return False
+        return super().is_failure(count, request)
+
+
+@register('yandex')
+class YandexSource(Source):
+    event_source = EventSource.YANDEX
+
+    def tasks(self, scraper, request):
+        return [
+            (f"{self.name}:{city.yandex}", partial(scraper.scrape_yandex, city.yandex, request.time_range, coords=city.coords))
+            for city in request.cities
+        ]
+
+
+@register('venues')
+class VenuesSource(Source):
+    event_source = EventSource.VENUE
+
+    def tasks(self, scraper, request):
+        # Каждая площадка — отдельная задача, чтобы медленный сайт не держал остальные
+        return [(venue_url, partial(scraper.scrape_venues, [venue_url])) for venue_url in request.venues]
+
+
+def build_sources(settings=None):
+    """Источники из config.yaml: имя -> настройки (type по умолчанию совпадает с именем)"""
+    if settings is None:
+        settings = {name: {} for name in SOURCE_TYPES}
+
+    sources = []
+    for name, source_settings in settings.items():
+        source_settings = dict(source_settings or {})
+        type_name = source_settings.pop('type', name)
+        if type_name not in SOURCE_TYPES:
+            raise ValueError(f"Неизвестный тип источника: {type_name}")
+        source = SOURCE_TYPES[type_name](name, source_settings)
+        if source.enabled:
+            sources.append(source)
+    return sources
+
+
+class CircuitBreaker:
+    """После threshold сбоев подряд задача пропускается cooldown секунд,
+    затем один пробный запрос решает, закрыть предохранитель или ждать снова"""
+
+    def __init__(self, threshold=3, cooldown=1800, failures=0, opened_until=0.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = failures
+        self.opened_until = opened_until
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.failures < self.threshold:
+                return True
+            now = time.time()
+            if now < self.opened_until:
+                return False
+            # Пробный запрос; остальные ждут его результата ещё один cooldown
+            self.opened_until = now + self.cooldown
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_until = time.time() + self.cooldown
+                return True
+            return False
+
+
+class CircuitBreakers:
+    """Предохранители по именам задач; состояние переживает перезапуск (JSON файл)"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._breakers = {}
+        self._saved = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Sources] Не удалось прочитать {path}: {e}")
+
+    def get(self, name, source):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            state = self._saved.get(name, {})
+            breaker = CircuitBreaker(source.failure_threshold, source.cooldown,
+                                     state.get('failures', 0), state.get('opened_until', 0.0))
+            self._breakers[name] = breaker
+        return breaker
+
+    def save(self):
+        if not self.path:
+            return
+        state = dict(self._saved)
+        state.update({
+            name: {'failures': b.failures, 'opened_until': b.opened_until}
+            for name, b in self._breakers.items()
+        })
+        # Через временный файл: оборванная запись не оставит битый JSON
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"[Sources] Не удалось сохранить {self.path}: {e}")
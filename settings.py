@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Загрузка config.yaml: проверка при чтении и кэш проверенного снимка
+Снимок (pickle) пересобирается, только когда у config.yaml меняются mtime или размер,
+поэтому обычный запуск не импортирует yaml и не разбирает файл заново
+"""
+
+import os
+import pickle
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = 'data/cache/config.pickle'
+# Меняется вместе с правилами проверки: старые снимки тогда пересобираются
+SNAPSHOT_VERSION = 2
+
+PERIODS = ('today', 'tomorrow', 'week', 'month')
+
+
+class ConfigError(ValueError):
+    """config.yaml не читается или не проходит проверку"""
+
+
+def load_config(path='config.yaml', snapshot_path=SNAPSHOT_PATH):
+    """Проверенный config.yaml (из снимка, если файл не менялся)"""
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ConfigError(f"{path}: {e.strerror}") from e
+    stamp = (SNAPSHOT_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    if snapshot_path:
+        config = _read_snapshot(snapshot_path, stamp)
+        if config is not None:
+            return config
+
+    config = parse_config(path)
+    if snapshot_path:
+        _write_snapshot(snapshot_path, stamp, config)
+    return config
+
+
+def parse_config(path):
+    """Разобрать и проверить config.yaml (без снимка)"""
+    import yaml
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        where = f"{path}:{mark.line + 1}:{mark.column + 1}" if mark else path
+        raise ConfigError(f"{where}: {getattr(e, 'problem', None) or e}") from e
+
+    errors = validate(config)
+    if errors:
+        raise ConfigError(f"{path}:\n" + "\n".join(f"  - {error}" for error in errors))
+    return config
+
+
+def validate(config):
+    """Список ошибок конфигурации (пустой — всё в порядке)"""
+    if not isinstance(config, dict):
+        return ["ожидается словарь секций"]
+
+    errors = []
+    territories = _section(config, 'territories', errors, required=True)
+    collections = _section(config, 'collections', errors, required=True)
+
+    from scraper.geo import UnknownCity, resolve_city
+
+    for key, territory in territories.items():
+        where = f"territories.{key}"
+        if not _is_mapping(territory, where, errors):
+            continue
+        has_name = _check(territory, 'name', str, where, errors, required=True)
+        _check(territory, 'thread_id', int, where, errors, required=True)
+        _check(territory, 'search_radius_km', (int, float), where, errors)
+        _check_list(territory, 'venues', where, errors)
+        # Без cities территория собирается по своему названию — оно тоже должно быть городом
+        if _check_list(territory, 'cities', where, errors):
+            cities = territory['cities']
+        else:
+            cities = [territory['name']] if has_name and 'cities' not in territory else []
+        for city in cities:
+            try:
+                resolve_city(city)
+            except UnknownCity as e:
+                errors.append(f"{where}.cities: {e}")
+
+    from processor.event import EventSource
+    from scraper.sources import SOURCE_TYPES
+
+    known_sources = {source.value for source in EventSource}
+    for key, collection in collections.items():
+        where = f"collections.{key}"
+        if not _is_mapping(collection, where, errors):
+            continue
+        _check(collection, 'name', str, where, errors, required=True)
+        _check(collection, 'is_free', bool, where, errors)
+        _check(collection, 'max_price', (int, float), where, errors)
+        _check(collection, 'include_undated', bool, where, errors)
+        _check_list(collection, 'places', where, errors)
+        if _check_list(collection, 'sources', where, errors):
+            unknown = [s for s in collection['sources'] if s not in known_sources]
+            if unknown:
+                errors.append(f"{where}.sources: неизвестные источники {', '.join(unknown)}")
+        if _check(collection, 'max_count', int, where, errors) and collection['max_count'] <= 0:
+            errors.append(f"{where}.max_count: должно быть больше нуля")
+        if collection.get('period') is not None and collection['period'] not in PERIODS:
+            errors.append(f"{where}.period: одно из {', '.join(PERIODS)}")
+
+    for name, source in _section(config, 'sources', errors).items():
+        where = f"sources.{name}"
+        if source is None or not _is_mapping(source, where, errors):
+            continue
+        type_name = source.get('type', name)
+        if type_name not in SOURCE_TYPES:
+            errors.append(f"{where}: неизвестный тип источника {type_name}")
+
+    daemon = _section(config, 'daemon', errors)
+    targets = set(territories) | set(collections)
+    targets |= {f"{t}/{c}" for t in territories for c in collections}
+    for option in ('intervals', 'periods'):
+        overrides = daemon.get(option) or {}
+        if not _is_mapping(overrides, f"daemon.{option}", errors):
+            continue
+        for key, value in overrides.items():
+            where = f"daemon.{option}.{key}"
+            if key not in targets:
+                errors.append(f"{where}: нет такой территории или подборки")
+            elif option == 'intervals' and (not isinstance(value, (int, float)) or value <= 0):
+                errors.append(f"{where}: ожидается число секунд больше нуля")
+            elif option == 'periods' and value not in PERIODS:
+                errors.append(f"{where}: одно из {', '.join(PERIODS)}")
+    if daemon.get('period') is not None and daemon['period'] not in PERIODS:
+        errors.append(f"daemon.period: одно из {', '.join(PERIODS)}")
+
+    return errors
+
+
+def _section(config, name, errors, required=False):
+    section = config.get(name)
+    if section is None:
+        if required:
+            errors.append(f"{name}: секция обязательна")
+        return {}
+    if not _is_mapping(section, name, errors):
+        return {}
+    if required and not section:
+        errors.append(f"{name}: секция пуста")
+    return section
+
+
+def _is_mapping(value, where, errors):
+    if isinstance(value, dict):
+        return True
+    errors.append(f"{where}: ожидается словарь")
+    return False
+
+
+def _check(item, key, types, where, errors, required=False):
+    """True — поле есть и нужного типа"""
+    value = item.get(key)
+    if value is None:
+        if required:
+            errors.append(f"{where}.{key}: поле обязательно")
+        return False
+    # bool — подкласс int: thread_id: true не должен пройти проверку
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in _as_tuple(types)):
+        errors.append(f"{where}.{key}: неверный тип {type(value).__name__}")
+        return False
+    return True
+
+
+def _check_list(item, key, where, errors):
+    """True — поле есть и это список строк"""
+    value = item.get(key)
+    if value is None:
+        return False
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        errors.append(f"{where}.{key}: ожидается список строк")
+        return False
+    return True
+
+
+def _as_tuple(types):
+    return types if isinstance(types, tuple) else (types,)
+
+
+def _read_snapshot(path, stamp):
+    try:
+        with open(path, 'rb') as f:
+            saved_stamp, config = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    return config if saved_stamp == stamp else None
+
+
+def _write_snapshot(path, stamp, config):
+    # Через временный файл: параллельный запуск не прочитает половину снимка
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((stamp, config), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"[Config] Снимок не сохранён: {e}")
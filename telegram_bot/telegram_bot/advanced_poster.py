@@ -4,23 +4,36 @@
 """
 
 import os
+import asyncio
 from telegram import Bot
 from telegram.error import TelegramError
 from datetime import datetime
 import logging
 
+from telegram_bot.telegram_bot.send_scheduler import SendScheduler, bot_sender
+
 logger = logging.getLogger(__name__)
 
 class AdvancedTelegramPoster:
     def __init__(self):
         self.bot = Bot(token=os.getenv('TELEGRAM_BOT_TOKEN'))
         self.group_id = int(os.getenv('TELEGRAM_GROUP_ID'))
+        self._scheduler = None
+        self._scheduler_loop = None
+    
+    def scheduler(self):
+        """Очередь отправки текущего event loop (общая для всех подборок)"""
+        loop = asyncio.get_running_loop()
+        if self._scheduler is None or self._scheduler_loop is not loop:
+            self._scheduler = SendScheduler(bot_sender(self.bot))
+            self._scheduler_loop = loop
+        return self._scheduler
     
     def format_event(self, event):
         """Красивое форматирование события"""
-        title = event.get('title', 'Событие без названия')[:100]
-        description = event.get('description', '')[:250]
-        price = event.get('price', 'Цена не указана')
+        title = (event.title or 'Событие без названия')[:100]
+        description = event.description[:250]
+        price = event.price_label
         
         message = f"🎭 <b>{title}</b>\n"
         message += f"💰 {price}\n"
@@ -41,24 +54,21 @@ class AdvancedTelegramPoster:
             header = f"✨ <b>{collection_title}</b> ✨\n"
             header += f"Найдено {len(events)} событий\n\n"
             
-            await self.bot.send_message(
-                chat_id=self.group_id,
-                text=header,
-                message_thread_id=thread_id,  # ← ЭТО ПУБЛИКУЕТ В КОНКРЕТНУЮ ТЕМУ!
-                parse_mode='HTML'
-            )
+            scheduler = self.scheduler()
+            # Все сообщения ставим в очередь темы сразу: порядок сохранится,
+            # а подборки в другие темы могут отправляться параллельно
+            sends = [scheduler.submit(self.group_id, thread_id, header, parse_mode='HTML')]
             
             # События
             for i, event in enumerate(events[:10], 1):
                 message = f"{i}. {self.format_event(event)}"
-                
-                await self.bot.send_message(
-                    chat_id=self.group_id,
-                    text=message,
-                    message_thread_id=thread_id,  # ← КАЖДОЕ В ТУ ЖЕ ТЕМУ!
+                sends.append(scheduler.submit(
+                    self.group_id, thread_id, message,  # ← КАЖДОЕ В ТУ ЖЕ ТЕМУ!
                     parse_mode='HTML',
                     disable_web_page_preview=True
-                )
+                ))
+            
+            await asyncio.gather(*sends)
             
             logger.info(f"✓ Опубликовано {len(events[:10])} событий в тему {thread_id}")
             return True
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Фото событий для публикации альбомом (sendMediaGroup)
+Скачивание один раз на содержимое (sha256), уменьшение перед загрузкой (Pillow,
+если установлен) и file_id из data.media_cache вместо повторной загрузки
+"""
+
+import hashlib
+import html
+import io
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from logs.metrics import metrics
+from telegram_bot.telegram_bot.send_scheduler import MediaGroup, TelegramSendError
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Bot API: до 10 фото в альбоме, до 10 МБ на фото, подпись до 1024 символов
+MAX_PHOTOS = 10
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+MAX_CAPTION = 200
+# Ответ 400 на устаревший или чужой file_id; остальные ошибки кэш file_id не трогают
+_STALE_FILE_ID_RE = re.compile(r'wrong (?:remote )?file identifier', re.I)
+
+
+def downscale(data, max_side=1280, quality=85):
+    """JPEG не больше max_side по длинной стороне; без Pillow или для битого файла — как есть"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEG декодируется сразу в уменьшенном масштабе — быстрее и меньше памяти
+            image.draft('RGB', (max_side, max_side))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.thumbnail((max_side, max_side))
+            out = io.BytesIO()
+            image.save(out, 'JPEG', quality=quality, optimize=True)
+    except (OSError, ValueError):
+        return data
+    smaller = out.getvalue()
+    return smaller if len(smaller) < len(data) else data
+
+
+class MediaLibrary:
+    def __init__(self, http, cache=None, max_side=1280, quality=85, workers=4, timeout=15, max_photos=MAX_PHOTOS):
+        self.http = http
+        # data.media_cache.MediaCache; None — file_id помнятся только до конца процесса
+        self.cache = cache
+        self.max_side = max_side
+        self.quality = quality
+        self.timeout = timeout
+        self.max_photos = min(max_photos, MAX_PHOTOS)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media')
+        # Уже уменьшенные, но ещё не загруженные фото: хэш -> байты (ограниченно, для демона)
+        self._prepared = OrderedDict()
+        self._file_ids = {}
+        self._lock = threading.Lock()
+
+    def album(self, events):
+        """MediaGroup из первых фото событий (None — фото нет); скачивание параллельно"""
+        picks = {}
+        for event in events:
+            if event.images and event.images[0] not in picks:
+                picks[event.images[0]] = event
+            if len(picks) >= self.max_photos:
+                break
+        if not picks:
+            return None
+
+        with metrics.timer('media.prepare'):
+            photos = list(self._executor.map(self._photo, picks))
+
+        items, digests = [], []
+        for event, photo in zip(picks.values(), photos):
+            # Один постер у двух событий (или не скачался) — в альбом не дублируем
+            if photo is None or photo[0] in digests:
+                continue
+            digest, file_id, data = photo
+            items.append((file_id, None if file_id else data, html.escape(event.title[:MAX_CAPTION])))
+            digests.append(digest)
+        if not items:
+            return None
+        return MediaGroup(items, keys=digests)
+
+    def watch(self, group, future):
+        """Следить за отправкой альбома: запомнить выданные Telegram file_id"""
+        future.add_done_callback(lambda f: self._sent(group, f))
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def _photo(self, url):
+        """(хэш, file_id или None, байты для загрузки) или None, если фото недоступно"""
+        digest = self.cache.digest(url) if self.cache is not None else None
+        if digest is not None:
+            file_id = self._known_file_id(digest)
+            if file_id:
+                return digest, file_id, None
+            with self._lock:
+                data = self._prepared.get(digest)
+            if data is not None:
+                return digest, None, data
+
+        try:
+            response = self.http.get(url, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"[Media] {url}: {e}")
+            return None
+        if response.status_code != 200 or not response.headers.get('Content-Type', 'image/').startswith('image/'):
+            logger.warning(f"[Media] {url}: HTTP {response.status_code}")
+            return None
+        metrics.count('media.downloads')
+
+        digest = hashlib.sha256(response.content).hexdigest()
+        if self.cache is not None:
+            self.cache.remember_url(url, digest)
+        # Тот же постер по другой ссылке уже загружали
+        file_id = self._known_file_id(digest)
+        if file_id:
+            return digest, file_id, None
+
+        with self._lock:
+            data = self._prepared.get(digest)
+        if data is None:
+            data = downscale(response.content, self.max_side, self.quality)
+            if len(data) > MAX_PHOTO_BYTES:
+                logger.warning(f"[Media] {url}: {len(data) // 1024} КБ — больше лимита Telegram")
+                return None
+            with self._lock:
+                self._prepared[digest] = data
+                while len(self._prepared) > 4 * self.max_photos:
+                    self._prepared.popitem(last=False)
+        return digest, None, data
+
+    def _known_file_id(self, digest):
+        file_id = self._file_ids.get(digest)
+        if file_id is None and self.cache is not None:
+            file_id = self.cache.file_id(digest)
+        return file_id
+
+    def _sent(self, group, future):
+        digests = group.keys
+        if future.cancelled() or future.exception() is not None:
+            error = 'отменено' if future.cancelled() else future.exception()
+            logger.warning(f"[Media] Альбом не отправлен: {error}")
+            if not (isinstance(error, TelegramSendError) and _STALE_FILE_ID_RE.search(str(error))):
+                return
+            # Telegram не знает file_id — в следующий раз загрузим файлы заново
+            for digest in digests:
+                self._file_ids.pop(digest, None)
+            if self.cache is not None:
+                self.cache.forget(digests)
+            return
+
+        result = future.result()
+        messages = result if isinstance(result, (list, tuple)) else [result]
+        pairs = []
+        for digest, message in zip(digests, messages):
+            photo = message.get('photo') if isinstance(message, dict) else getattr(message, 'photo', None)
+            if not photo:
+                continue
+            # Последний размер — самый крупный
+            largest = photo[-1]
+            file_id = largest['file_id'] if isinstance(largest, dict) else largest.file_id
+            self._file_ids[digest] = file_id
+            with self._lock:
+                self._prepared.pop(digest, None)
+            pairs.append((digest, file_id))
+        metrics.count('media.uploaded', sum(1 for file_id, _, _ in group.items if file_id is None))
+        if pairs and self.cache is not None:
+            self.cache.remember_file_ids(pairs)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Асинхронная очередь отправки в Telegram с учётом flood-лимитов
+Token bucket на чат и общий, автоматический retry_after, порядок внутри темы
+"""
+
+import asyncio
+import json
+import threading
+import time
+import logging
+
+from logs.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class FloodWait(Exception):
+    """Telegram ответил 429: повторить не раньше чем через retry_after секунд"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Flood control: retry after {retry_after}s")
+        self.retry_after = float(retry_after)
+
+
+class TelegramSendError(Exception):
+    pass
+
+
+class MediaGroup:
+    """Альбом фото вместо текста сообщения (sendMediaGroup, одно фото — sendPhoto).
+
+    items — [(file_id или None, байты JPEG или None, подпись)]: известное Telegram
+    фото уходит ссылкой на file_id, новое — загрузкой файла; keys — ключи фото
+    в том же порядке (хэши содержимого для кэша file_id).
+    """
+
+    def __init__(self, items, keys=()):
+        self.items = list(items)
+        self.keys = list(keys)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class AsyncTokenBucket:
+    def __init__(self, rate_per_second, burst=1):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд (после 429 от Telegram)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class SendScheduler:
+    """Очередь на каждую тему (chat_id, message_thread_id): внутри темы строгий порядок,
+    разные темы отправляются параллельно в пределах лимитов чата и общего лимита бота"""
+
+    def __init__(self, send, global_per_second=30, chat_per_minute=20, chat_burst=3, max_retries=5):
+        # send — корутина send(chat_id, thread_id, text, **options), при 429 бросает FloodWait
+        self.send = send
+        self.chat_per_minute = chat_per_minute
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+
+        self.global_bucket = AsyncTokenBucket(global_per_second, burst=global_per_second)
+        self.chat_buckets = {}
+        self.queues = {}
+        self.workers = {}
+        self.flood_waits = 0
+
+    def submit(self, chat_id, thread_id, text, **options):
+        """Поставить сообщение (текст или MediaGroup) в очередь темы; вернуть future с результатом отправки"""
+        return self.submit_chain(chat_id, thread_id, [(text, options)])[0]
+
+    def submit_chain(self, chat_id, thread_id, messages):
+        """Цепочка [(текст или MediaGroup, options)] подряд в одной теме; вернуть futures.
+
+        После первой неотправленной части остальные не отправляются (их futures
+        завершаются TelegramSendError): продолжение без начала в теме не нужно.
+        """
+        key = (chat_id, thread_id)
+        if key not in self.queues:
+            self.queues[key] = asyncio.Queue()
+            self.workers[key] = asyncio.create_task(self._worker(key))
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in messages]
+        self.queues[key].put_nowait((list(messages), futures))
+        return futures
+
+    async def join(self):
+        """Дождаться отправки всего, что уже в очередях"""
+        await asyncio.gather(*(queue.join() for queue in self.queues.values()))
+
+    async def close(self):
+        await self.join()
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.queues.clear()
+        self.workers.clear()
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = AsyncTokenBucket(self.chat_per_minute / 60.0, burst=self.chat_burst)
+        return self.chat_buckets[chat_id]
+
+    async def _worker(self, key):
+        chat_id, thread_id = key
+        queue = self.queues[key]
+        chat_bucket = self._chat_bucket(chat_id)
+
+        while True:
+            messages, futures = await queue.get()
+            failed = None
+            try:
+                for part_num, ((text, options), future) in enumerate(zip(messages, futures), 1):
+                    if failed is not None:
+                        if not future.done():
+                            future.set_exception(TelegramSendError(f"не отправлено: часть {failed} не дошла"))
+                        continue
+                    try:
+                        result = await self._send_with_retry(chat_bucket, chat_id, thread_id, text, options)
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as e:
+                        failed = part_num
+                        if not future.done():
+                            future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def _send_with_retry(self, chat_bucket, chat_id, thread_id, text, options):
+        # Альбом Telegram считает как столько сообщений, сколько в нём фото
+        cost = len(text) if isinstance(text, MediaGroup) else 1
+        for attempt in range(self.max_retries + 1):
+            for _ in range(cost):
+                await chat_bucket.acquire()
+                await self.global_bucket.acquire()
+            try:
+                with metrics.timer('send'):
+                    result = await self.send(chat_id, thread_id, text, **options)
+                metrics.count('send.messages')
+                return result
+            except FloodWait as e:
+                self.flood_waits += 1
+                metrics.count('telegram.429')
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"[Telegram] 429 в теме {thread_id}: ждём {e.retry_after:g}с")
+                # Лимит общий на чат — притормаживаем все его темы
+                chat_bucket.pause(e.retry_after)
+
+
+def http_sender(http, token, api_url=TELEGRAM_API_URL):
+    """send() поверх общего HTTP клиента (scraper.http_client) — для main.py"""
+    url = f"{api_url}/bot{token}"
+
+    async def send(chat_id, thread_id, text, **options):
+        if isinstance(text, MediaGroup):
+            method, request = _media_request(chat_id, thread_id, text, options)
+        else:
+            data = {"chat_id": chat_id, "text": text, "message_thread_id": thread_id, **options}
+            method, request = 'sendMessage', {'json': data, 'timeout': 10}
+        # 429 обрабатывает планировщик, поэтому повторы клиента отключены
+        response = await asyncio.to_thread(http.post, f"{url}/{method}", retries=0, **request)
+        if response.status_code == 429:
+            retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+            raise FloodWait(retry_after)
+        if response.status_code != 200:
+            raise TelegramSendError(response.text)
+        return response.json().get('result')
+
+    return send
+
+
+def _media_request(chat_id, thread_id, group, options):
+    """Метод и multipart-запрос для альбома: новые фото — файлами attach://photoN"""
+    media, files = [], {}
+    for i, (file_id, data, caption) in enumerate(group.items):
+        item = {'type': 'photo', 'media': file_id or f"attach://photo{i}"}
+        if caption:
+            item.update(caption=caption, parse_mode=options.get('parse_mode', 'HTML'))
+        if file_id is None:
+            files[f"photo{i}"] = (f"photo{i}.jpg", data, 'image/jpeg')
+        media.append(item)
+
+    fields = {'chat_id': chat_id, 'message_thread_id': thread_id}
+    if len(media) == 1:
+        # Альбом из одного фото Telegram не принимает
+        item = media[0]
+        fields.update(photo=item['media'], **{k: v for k, v in item.items() if k in ('caption', 'parse_mode')})
+        method = 'sendPhoto'
+    else:
+        fields['media'] = json.dumps(media, ensure_ascii=False)
+        method = 'sendMediaGroup'
+    # Загрузка файлов дольше обычного сообщения
+    return method, {'data': fields, 'files': files or None, 'timeout': 60}
+
+
+def bot_sender(bot):
+    """send() поверх telegram.Bot — для AdvancedTelegramPoster"""
+    from telegram.error import RetryAfter
+
+    async def send(chat_id, thread_id, text, **options):
+        try:
+            if isinstance(text, MediaGroup):
+                from telegram import InputMediaPhoto
+                parse_mode = options.get('parse_mode')
+                if len(text) == 1:
+                    file_id, data, caption = text.items[0]
+                    return await bot.send_photo(chat_id=chat_id, message_thread_id=thread_id, photo=file_id or data,
+                                                caption=caption or None, parse_mode=parse_mode)
+                media = [InputMediaPhoto(file_id or data, caption=caption or None, parse_mode=parse_mode)
+                         for file_id, data, caption in text.items]
+                return await bot.send_media_group(chat_id=chat_id, message_thread_id=thread_id, media=media)
+            return await bot.send_message(chat_id=chat_id, message_thread_id=thread_id, text=text, **options)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            raise FloodWait(getattr(retry_after, 'total_seconds', lambda: retry_after)())
+
+    return send
+
+
+class BackgroundSender:
+    """Планировщик в отдельном потоке со своим event loop — для синхронного кода.
+
+    submit() сразу возвращает concurrent.futures.Future, так что отправка идёт,
+    пока вызывающий код собирает и анализирует следующую территорию.
+    """
+
+    def __init__(self, make_send, **scheduler_settings):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='telegram-sender', daemon=True)
+        self._thread.start()
+
+        async def create():
+            return SendScheduler(make_send(), **scheduler_settings)
+
+        self.scheduler = asyncio.run_coroutine_threadsafe(create(), self.loop).result()
+
+    def submit(self, chat_id, thread_id, text, **options):
+        async def enqueue():
+            return await self.scheduler.submit(chat_id, thread_id, text, **options)
+        return asyncio.run_coroutine_threadsafe(enqueue(), self.loop)
+
+    def submit_chain(self, chat_id, thread_id, messages):
+        """Как SendScheduler.submit_chain; вернуть concurrent.futures.Future на каждую часть"""
+        async def enqueue():
+            return self.scheduler.submit_chain(chat_id, thread_id, messages)
+
+        async def wait(future):
+            return await future
+
+        futures = asyncio.run_coroutine_threadsafe(enqueue(), self.loop).result()
+        return [asyncio.run_coroutine_threadsafe(wait(future), self.loop) for future in futures]
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.scheduler.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
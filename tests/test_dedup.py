@@ -0,0 +1,87 @@
+from processor.dedup import (
+    SHINGLE_CACHE_SIZE, Deduplicator, _hash_shingle, deduplicate, jaccard, normalize_title, shingles,
+)
+from processor.event import Event, EventSource
+
+START = 1_800_000_000
+
+
+def event(title, source=EventSource.KUDAGO, **fields):
+    return Event(title=title, source=source, **fields)
+
+
+def similarity(a, b):
+    return jaccard(shingles(normalize_title(a)), shingles(normalize_title(b)))
+
+
+def test_normalize_drops_case_punctuation_and_genre():
+    assert normalize_title("Концерт «Щелкунчик»!") == "щелкунчик"
+    # Только жанровые слова — оставляем как есть, чтобы название не стало пустым
+    assert normalize_title("Концерт") == "концерт"
+
+
+def test_same_event_from_two_sources_is_merged():
+    kudago = event("Спектакль «Вишнёвый сад»", start=START, place="МХТ им. Чехова",
+                   description="Постановка по пьесе Чехова")
+    yandex = event("Вишневый сад", EventSource.YANDEX, url="https://afisha.yandex.ru/x")
+    result = deduplicate([kudago, yandex])
+    assert len(result) == 1
+    merged = result[0]
+    assert merged.start == START
+    assert merged.description == "Постановка по пьесе Чехова"
+
+
+def test_same_title_on_another_day_is_kept():
+    first = event("Вишнёвый сад", start=START)
+    second = event("Вишнёвый сад", start=START + 86400)
+    assert len(deduplicate([first, second])) == 2
+
+
+def test_incompatible_places_are_kept():
+    first = event("Вишнёвый сад", start=START, place="МХТ им. Чехова")
+    second = event("Вишнёвый сад", start=START, place="Театр на Таганке")
+    assert len(deduplicate([first, second])) == 2
+
+
+def test_merge_threshold_with_known_time():
+    base = "Лебединое озеро в Большом театре"
+    close = "Лебединое озеро в Большом"
+    far = "Лебединое озеро на льду"
+    assert similarity(base, close) >= 0.6
+    assert similarity(base, far) < 0.6
+
+    dedup = Deduplicator()
+    dedup.add(event(base, start=START))
+    assert dedup.add(event(close, EventSource.YANDEX, start=START))[1] is False
+    assert dedup.add(event(far, EventSource.YANDEX, start=START))[1] is True
+    assert dedup.merged == 1
+
+
+def test_unknown_time_needs_stricter_threshold():
+    base = "Лебединое озеро в Большом театре"
+    close = "Лебединое озеро в Большом"
+    assert similarity(base, close) < 0.8
+
+    dedup = Deduplicator()
+    dedup.add(event(base, start=START))
+    # У Яндекса дата неизвестна — похожести 0.6 уже мало
+    assert dedup.add(event(close, EventSource.YANDEX))[1] is True
+
+
+def test_richer_card_becomes_base():
+    poor = event("Вишнёвый сад", EventSource.YANDEX, url="https://afisha.yandex.ru/x")
+    rich = event("Вишнёвый сад", start=START, place="МХТ", description="Постановка по пьесе Чехова",
+                 images=("https://example.org/1.jpg",))
+    dedup = Deduplicator()
+    assert dedup.add(poor)[1] is True
+    merged, is_new = dedup.add(rich)
+    assert not is_new
+    assert merged is rich
+    assert merged.url == "https://afisha.yandex.ru/x"
+
+
+def test_shingle_cache_is_bounded():
+    _hash_shingle.cache_clear()
+    for i in range(SHINGLE_CACHE_SIZE + 100):
+        _hash_shingle(f"{i:x}")
+    assert _hash_shingle.cache_info().currsize == SHINGLE_CACHE_SIZE
@@ -0,0 +1,81 @@
+from formatter.digest import MESSAGE_LIMIT, DigestRenderer, DigestStream, telegram_length
+from processor.event import Event, EventSource
+
+COLLECTION = {'name': 'Бесплатно <сегодня>', 'max_count': 100}
+TERRITORY = {'name': 'Москва & область', 'thread_id': 1}
+
+
+def events(count, description=''):
+    return [
+        Event(title=f"Событие номер {i} 🎭", source=EventSource.KUDAGO, place=f"Площадка {i % 7}",
+              price_text="Бесплатно", url=f"https://kudago.com/e/{i}/", description=description)
+        for i in range(count)
+    ]
+
+
+def test_length_counts_utf16_units_without_tags():
+    assert telegram_length("<b>abc</b>") == 3
+    assert telegram_length("&lt;b&gt;") == 3
+    # Эмодзи вне BMP — две кодовые единицы UTF-16
+    assert telegram_length("🎭") == 2
+    assert telegram_length('<a href="https://example.org/very/long">x</a>') == 1
+
+
+def test_names_are_escaped():
+    message = DigestRenderer().render(COLLECTION, TERRITORY, events(1))[0]
+    assert "Бесплатно &lt;сегодня&gt;" in message
+    assert "Москва &amp; область" in message
+
+
+def test_messages_fit_limit_and_keep_whole_cards():
+    renderer = DigestRenderer()
+    selected = events(120)
+    parts = renderer.render_parts(COLLECTION, TERRITORY, selected)
+    assert len(parts) > 1
+    for message, _ in parts:
+        assert telegram_length(message) <= MESSAGE_LIMIT
+    # Каждое событие ровно в одной части, порядок сохранён
+    assert [event for _, part in parts for event in part] == selected
+    for message, part in parts:
+        for event in part:
+            assert event.url in message
+
+
+def test_pack_fills_up_to_exact_limit():
+    renderer = DigestRenderer(limit=20)
+    # Заголовок 10 + блок 10 = ровно 20 — ещё помещается; следующий блок — новое сообщение
+    messages = renderer.pack("h" * 10, "c", ["a" * 10, "b" * 10])
+    assert messages == ["h" * 10 + "a" * 10, "c" + "b" * 10]
+
+
+def test_pack_at_telegram_limit_counts_emoji_twice():
+    renderer = DigestRenderer()
+    block = "🎭" * 1000          # 2000 единиц UTF-16, хотя len() == 1000
+    messages = renderer.pack("x" * 96, "c", [block, block])
+    assert len(messages) == 1
+    assert telegram_length(messages[0]) == MESSAGE_LIMIT
+    messages = renderer.pack("x" * 97, "c", [block, block])
+    assert len(messages) == 2
+
+
+def test_oversized_block_is_not_split():
+    messages = DigestRenderer(limit=10).pack("h", "c", ["x" * 50])
+    assert messages == ["h" + "x" * 50]
+
+
+def test_stream_emits_full_messages_early():
+    stream = DigestStream(DigestRenderer(), COLLECTION, TERRITORY)
+    ready = []
+    for event in events(60):
+        ready.extend(stream.add(event))
+    assert ready, "первое сообщение должно уйти до конца потока"
+    ready.extend(stream.finish())
+    assert sum(len(part) for _, part in ready) == 60
+    assert all(telegram_length(message) <= MESSAGE_LIMIT for message, _ in ready)
+
+
+def test_stream_respects_max_count():
+    stream = DigestStream(DigestRenderer(), COLLECTION, TERRITORY, max_count=3)
+    for event in events(3):
+        stream.add(event)
+    assert stream.full
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from processor.event import Event, EventSource, parse_price
+
+
+def test_price_range_without_separator():
+    assert parse_price("500 1500 руб") == (500.0, 1500.0)
+
+
+def test_price_thousand_separators():
+    assert parse_price("от 1 500 до 2 000 рублей") == (1500.0, 2000.0)
+    assert parse_price("1 200 ₽") == (1200.0, 1200.0)
+    assert parse_price("12 000") == (12000.0, 12000.0)
+
+
+def test_price_dash_range():
+    assert parse_price("300–500 ₽") == (300.0, 500.0)
+
+
+def test_free_without_numbers():
+    assert parse_price("Бесплатно") == (0.0, 0.0)
+    assert parse_price("вход свободный, 6+") == (0.0, 0.0)
+
+
+def test_free_token_with_price_is_paid():
+    assert parse_price("бесплатно, экскурсия 500 руб") == (500.0, 500.0)
+
+
+def test_age_rating_is_not_price():
+    assert parse_price("18+ 700 руб") == (700.0, 700.0)
+    assert parse_price("12+") == (None, None)
+
+
+def test_empty_and_numeric_price():
+    assert parse_price(None) == (None, None)
+    assert parse_price("") == (None, None)
+    assert parse_price(0) == (0.0, 0.0)
+
+
+def test_event_parses_price_text_on_creation():
+    event = Event(title="Выставка", source=EventSource.KUDAGO, price_text="от 1 500 до 2 000 рублей")
+    assert (event.price_min, event.price_max) == (1500.0, 2000.0)
+    assert not event.is_free
+
+
+def test_explicit_price_is_not_overwritten():
+    event = Event(title="Лекция", source=EventSource.KUDAGO, price_min=0.0, price_max=0.0, price_text="по записи 300")
+    assert event.is_free
+
+
+def test_date_and_time_from_start():
+    start = int(datetime(2026, 3, 8, 19, 30).timestamp())
+    event = Event(title="Спектакль", source=EventSource.KUDAGO, start=start)
+    assert event.date == "08.03.2026"
+    assert event.time == "19:30"
+    assert Event(title="Без даты", source=EventSource.YANDEX).date == ""
+
+
+def test_uid_prefers_source_id():
+    assert Event(title="A", source=EventSource.KUDAGO, source_id="42").uid == "KUDAGO:42"
+    first = Event(title="A", source=EventSource.VENUE, url="https://example.org/a")
+    second = Event(title="A", source=EventSource.VENUE, url="https://example.org/a")
+    assert first.uid == second.uid
+    assert first.uid.startswith("VENUE:#")
+
+
+def test_undated_events_sort_last():
+    dated = Event(title="B", source=EventSource.KUDAGO, start=2_000_000_000)
+    undated = Event(title="A", source=EventSource.YANDEX)
+    assert sorted([undated, dated], key=Event.sort_key) == [dated, undated]
+
+
+def test_dict_round_trip():
+    event = Event(title="Концерт", source=EventSource.KUDAGO, start=1_800_000_000, place="Клуб",
+                  price_text="500 руб", images=("https://example.org/1.jpg",), coords=(55.75, 37.62))
+    assert Event.from_dict(event.to_dict()) == event
@@ -0,0 +1,86 @@
+from processor.event import Event, EventSource
+from processor.event_index import EventIndex, Query, compile_collection
+
+DAY = 24 * 3600
+T0 = 1_700_000_000
+
+
+def event(title, start=None, price_text='', source=EventSource.KUDAGO, place=''):
+    return Event(title=title, source=source, start=start, price_text=price_text, place=place)
+
+
+def titles(events):
+    return [e.title for e in events]
+
+
+def sample():
+    return [
+        event("Послезавтра", T0 + 2 * DAY, "500 руб"),
+        event("Вчера", T0 - DAY, "Бесплатно"),
+        event("Сегодня утром", T0, "Бесплатно"),
+        event("Сегодня вечером", T0 + DAY - 1, "1 500 руб"),
+        event("Без даты", None, "300 руб", source=EventSource.YANDEX),
+        event("Завтра", T0 + DAY, ""),
+    ]
+
+
+def test_window_bounds_are_inclusive():
+    index = EventIndex(sample())
+    query = Query(start=T0, end=T0 + DAY - 1, include_undated=False)
+    assert titles(index.query(query)) == ["Сегодня утром", "Сегодня вечером"]
+
+
+def test_window_excludes_events_just_outside():
+    index = EventIndex(sample())
+    query = Query(start=T0 + 1, end=T0 + DAY - 2, include_undated=False)
+    assert index.query(query) == []
+
+
+def test_undated_events_follow_dated_ones():
+    index = EventIndex(sample())
+    result = index.query(Query(start=T0 + DAY, end=T0 + 2 * DAY))
+    assert titles(result) == ["Завтра", "Послезавтра", "Без даты"]
+
+
+def test_open_window_returns_everything_in_start_order():
+    index = EventIndex(sample())
+    result = index.query(Query(max_count=None))
+    assert titles(result) == ["Вчера", "Сегодня утром", "Сегодня вечером", "Завтра", "Послезавтра", "Без даты"]
+
+
+def test_max_count_cuts_after_sorting():
+    index = EventIndex(sample())
+    assert titles(index.query(Query(max_count=2))) == ["Вчера", "Сегодня утром"]
+
+
+def test_free_window_keeps_unknown_price():
+    index = EventIndex(sample())
+    result = index.query(Query(start=T0, end=T0 + 2 * DAY, is_free=True, include_undated=False))
+    assert titles(result) == ["Сегодня утром", "Завтра"]
+
+
+def test_max_price_is_checked_exactly_inside_bucket():
+    index = EventIndex(sample())
+    # 1500 и 500 лежат в корзинах 1000+ и 500+; граница 1000 отсекает только 1500
+    result = index.query(Query(max_price=1000, include_undated=False, max_count=None))
+    assert titles(result) == ["Вчера", "Сегодня утром", "Завтра", "Послезавтра"]
+
+
+def test_compile_collection_uses_window_and_filters():
+    collection = {'sources': ['Яндекс.Афиша'], 'max_count': 5}
+    query = compile_collection(collection, (T0, T0 + DAY))
+    assert (query.start, query.end, query.max_count) == (T0, T0 + DAY, 5)
+    assert query.sources == frozenset({EventSource.YANDEX})
+    assert titles(EventIndex(sample()).query(query)) == ["Без даты"]
+
+
+def test_index_agrees_with_streaming_matches():
+    events = sample()
+    index = EventIndex(events)
+    for query in (
+        Query(start=T0, end=T0 + DAY, max_count=None),
+        Query(start=T0 - DAY, end=T0, is_free=True, max_count=None),
+        Query(max_price=500, include_undated=False, max_count=None),
+    ):
+        expected = sorted((e for e in events if query.matches(e)), key=Event.sort_key)
+        assert index.query(query) == expected
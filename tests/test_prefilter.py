@@ -0,0 +1,48 @@
+import time
+
+from ai.prefilter import ACCEPT, ASK_LLM, MAX_SCORE, REJECT, Prefilter
+from processor.event import Event, EventSource
+
+
+def full_card(**fields):
+    """Полная карточка KudaGo: набирает максимум эвристической оценки"""
+    values = dict(
+        title="Концерт органной музыки",
+        source=EventSource.KUDAGO,
+        description="Вечер органной музыки Баха и Генделя в исполнении солистов филармонии",
+        start=int(time.time()) + 3600,
+        place="Филармония",
+        price_text="500 руб",
+        url="https://kudago.com/msk/event/organ/",
+    )
+    values.update(fields)
+    return Event(**values)
+
+
+def test_full_card_reaches_max_score():
+    assert Prefilter().score(full_card()) == MAX_SCORE
+
+
+def test_full_card_still_goes_to_llm_by_default():
+    decision, analysis = Prefilter().classify(full_card())
+    assert decision == ASK_LLM
+    assert analysis is None
+
+
+def test_explicit_accept_from_accepts_locally():
+    decision, analysis = Prefilter({'accept_from': MAX_SCORE}).classify(full_card())
+    assert decision == ACCEPT
+    assert analysis['quality'] == MAX_SCORE
+
+
+def test_bad_words_reject_before_scoring():
+    event = full_card(description="Шоу-программа со стриптизом и напитками для гостей клуба")
+    decision, reason = Prefilter({'accept_from': MAX_SCORE}).classify(event)
+    assert decision == REJECT
+    assert reason == "запрещённые слова"
+
+
+def test_paid_event_rejected_from_free_collection():
+    event = full_card(price_text="бесплатно, экскурсия 500 руб")
+    decision, _ = Prefilter(collection={'is_free': True}).classify(event)
+    assert decision == REJECT
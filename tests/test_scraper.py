@@ -0,0 +1,113 @@
+import time
+
+from data.event_store import EventStore
+from scraper.multi_source_scraper import MultiSourceEventScraper
+from scraper.sources import complete_sources
+
+TERRITORY = {'name': 'Москва и Петербург', 'cities': ['Москва', 'Санкт-Петербург']}
+
+
+class Response:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeHttp:
+    """KudaGo по городам: location -> список страниц (dict ответа, код ошибки или исключение)"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, params=None, **kwargs):
+        params = params or {}
+        page = self.pages[params['location']][params.get('page', 1) - 1]
+        if isinstance(page, Exception):
+            raise page
+        if isinstance(page, int):
+            return Response(page)
+        return Response(200, page)
+
+
+def kudago_page(city, ids, count=None, has_next=False):
+    start = int(time.time()) + 3600
+    return {
+        'count': count if count is not None else len(ids),
+        'next': 'https://kudago.com/next' if has_next else None,
+        'results': [
+            {'id': i, 'title': f"{city} {i}", 'dates': [{'start': start}], 'publication_date': 1000 + i}
+            for i in ids
+        ],
+    }
+
+
+def scraper(pages, **settings):
+    return MultiSourceEventScraper(sources={'kudago': {}}, http_client=FakeHttp(pages), **settings)
+
+
+def test_failed_city_keeps_kudago_incomplete(tmp_path):
+    pages = {'msk': [kudago_page('msk', [1, 2])], 'spb': [ConnectionError("сеть недоступна")]}
+    results = {}
+    events = scraper(pages).scrape_all(TERRITORY, results=results)
+
+    assert [e.title for e in events] == ['msk 1', 'msk 2']
+    assert results['kudago:msk'][1] == 2
+    assert results['kudago:spb'][1] is None
+    assert complete_sources(results) == set()
+
+    store = EventStore(str(tmp_path / 'events.sqlite3'))
+    try:
+        store.record_fetched('msk', events, 'week', complete=complete_sources(results))
+        assert store.watermark('msk', 'KudaGo', 'week') is None
+    finally:
+        store.close()
+
+
+def test_http_error_is_not_an_empty_answer():
+    pages = {'msk': [503], 'spb': [kudago_page('spb', [])]}
+    results = {}
+    scraper(pages).scrape_all(TERRITORY, concurrent=False, results=results)
+    assert results['kudago:msk'][1] is None
+    assert results['kudago:spb'][1] == 0
+
+
+def test_complete_fetch_moves_watermark(tmp_path):
+    pages = {'msk': [kudago_page('msk', [1, 2])], 'spb': [kudago_page('spb', [3])]}
+    results = {}
+    events = scraper(pages).scrape_all(TERRITORY, results=results)
+    assert complete_sources(results) == {'KudaGo'}
+
+    store = EventStore(str(tmp_path / 'events.sqlite3'))
+    try:
+        store.record_fetched('msk', events, 'week', complete=complete_sources(results))
+        assert store.watermark('msk', 'KudaGo', 'week') == 1003
+    finally:
+        store.close()
+
+
+def test_missing_later_page_fails_the_task():
+    pages = {
+        'msk': [kudago_page('msk', range(100), count=250, has_next=True), kudago_page('msk', range(100, 200)), 500],
+        'spb': [kudago_page('spb', [1])],
+    }
+    results = {}
+    events = list(scraper(pages).iter_all(TERRITORY, results=results))
+
+    # Дошедшее уже отдано потребителю, но задача — сбой
+    assert len(events) == 201
+    assert results['kudago:msk'][1] is None
+    assert complete_sources(results) == set()
+
+
+def test_missing_later_page_fails_paginated_scrape():
+    pages = {
+        'msk': [kudago_page('msk', range(100), count=150, has_next=True), ConnectionError("обрыв")],
+        'spb': [kudago_page('spb', [1])],
+    }
+    results = {}
+    events = scraper(pages, paginate=True).scrape_all(TERRITORY, results=results)
+    assert [e.title for e in events] == ['spb 1']
+    assert results['kudago:msk'][1] is None
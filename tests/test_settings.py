@@ -0,0 +1,179 @@
+import os
+
+import pytest
+
+import settings
+from settings import ConfigError, load_config, parse_config, validate
+
+
+def minimal(**sections):
+    config = {
+        'territories': {'msk': {'name': 'Москва', 'thread_id': 10}},
+        'collections': {'all': {'name': 'Все события', 'max_count': 10}},
+    }
+    config.update(sections)
+    return config
+
+
+def test_minimal_config_is_valid():
+    assert validate(minimal()) == []
+
+
+def test_shipped_config_is_valid():
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
+    assert parse_config(config_path)['territories']
+
+
+def test_not_a_mapping():
+    assert validate(['territories']) == ["ожидается словарь секций"]
+
+
+def test_required_sections():
+    assert validate({}) == ["territories: секция обязательна", "collections: секция обязательна"]
+    assert "collections: секция пуста" in validate(minimal(collections={}))
+
+
+def test_thread_id_type_and_bool():
+    config = minimal(territories={
+        'a': {'name': 'Москва', 'thread_id': '10'},
+        'b': {'name': 'Москва', 'thread_id': True},
+        'c': {'name': 'Москва'},
+    })
+    assert validate(config) == [
+        "territories.a.thread_id: неверный тип str",
+        "territories.b.thread_id: неверный тип bool",
+        "territories.c.thread_id: поле обязательно",
+    ]
+
+
+def test_unknown_city():
+    config = minimal(territories={'x': {'name': 'Атлантида', 'thread_id': 1}})
+    [error] = validate(config)
+    assert error.startswith("territories.x.cities: Неизвестный город: Атлантида")
+
+
+def test_cities_override_name():
+    config = minimal(territories={'x': {'name': 'Северо-Запад', 'thread_id': 1, 'cities': ['Санкт-Петербург', 'Выборг']}})
+    assert validate(config) == []
+
+
+def test_unknown_collection_sources():
+    config = minimal(collections={'c': {'name': 'Подборка', 'sources': ['KudaGo', 'Афиша']}})
+    assert validate(config) == ["collections.c.sources: неизвестные источники Афиша"]
+
+
+def test_max_count_must_be_positive():
+    config = minimal(collections={'c': {'name': 'Подборка', 'max_count': 0}})
+    assert validate(config) == ["collections.c.max_count: должно быть больше нуля"]
+
+
+def test_bad_collection_period():
+    config = minimal(collections={'c': {'name': 'Подборка', 'period': 'year'}})
+    [error] = validate(config)
+    assert error.startswith("collections.c.period: одно из today")
+
+
+def test_unknown_source_type():
+    config = minimal(sources={'kudago': {}, 'afisha': {'timeout': 5}})
+    assert validate(config) == ["sources.afisha: неизвестный тип источника afisha"]
+
+
+def test_daemon_overrides():
+    config = minimal(daemon={
+        'intervals': {'msk': 600, 'all': 0, 'msk/all': 'hour', 'spb': 60},
+        'periods': {'msk/all': 'week', 'all': 'year'},
+        'period': 'never',
+    })
+    errors = validate(config)
+    assert errors[:3] == [
+        "daemon.intervals.all: ожидается число секунд больше нуля",
+        "daemon.intervals.msk/all: ожидается число секунд больше нуля",
+        "daemon.intervals.spb: нет такой территории или подборки",
+    ]
+    assert errors[3].startswith("daemon.periods.all: одно из")
+    assert errors[4].startswith("daemon.period: одно из")
+    assert len(errors) == 5
+
+
+def test_parse_config_collects_all_errors(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text("territories:\n  msk: {name: Москва}\ncollections: {}\n", encoding='utf-8')
+    with pytest.raises(ConfigError) as error:
+        parse_config(str(path))
+    assert "territories.msk.thread_id: поле обязательно" in str(error.value)
+    assert "collections: секция пуста" in str(error.value)
+
+
+def test_yaml_syntax_error_has_position(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text("territories: [\n", encoding='utf-8')
+    with pytest.raises(ConfigError, match=r"config\.yaml:\d+:\d+"):
+        parse_config(str(path))
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(ConfigError):
+        load_config(str(tmp_path / 'missing.yaml'), snapshot_path=None)
+
+
+VALID_YAML = """\
+territories:
+  msk: {name: Москва, thread_id: 10}
+collections:
+  all: {name: Все события, max_count: 10}
+"""
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Счётчик разборов config.yaml (снимок их не вызывает)"""
+    calls = []
+    parse = settings.parse_config
+    monkeypatch.setattr(settings, 'parse_config', lambda path: calls.append(path) or parse(path))
+    return calls
+
+
+def test_second_load_comes_from_snapshot(tmp_path, parses):
+    path, snapshot = tmp_path / 'config.yaml', tmp_path / 'cache' / 'config.pickle'
+    path.write_text(VALID_YAML, encoding='utf-8')
+
+    first = load_config(str(path), str(snapshot))
+    second = load_config(str(path), str(snapshot))
+    assert len(parses) == 1
+    assert snapshot.exists()
+    assert second == first
+
+
+def test_changed_size_revalidates(tmp_path, parses):
+    path, snapshot = tmp_path / 'config.yaml', tmp_path / 'config.pickle'
+    path.write_text(VALID_YAML, encoding='utf-8')
+    load_config(str(path), str(snapshot))
+
+    path.write_text(VALID_YAML.replace("max_count: 10", "max_count: 0"), encoding='utf-8')
+    with pytest.raises(ConfigError, match="max_count: должно быть больше нуля"):
+        load_config(str(path), str(snapshot))
+    assert len(parses) == 2
+
+
+def test_changed_mtime_revalidates(tmp_path, parses):
+    path, snapshot = tmp_path / 'config.yaml', tmp_path / 'config.pickle'
+    path.write_text(VALID_YAML, encoding='utf-8')
+    load_config(str(path), str(snapshot))
+
+    # Тот же размер, другое содержимое и время изменения
+    path.write_text(VALID_YAML.replace("thread_id: 10", "thread_id: 20"), encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    config = load_config(str(path), str(snapshot))
+    assert config['territories']['msk']['thread_id'] == 20
+    assert len(parses) == 2
+
+
+def test_broken_snapshot_is_rebuilt(tmp_path, parses):
+    path, snapshot = tmp_path / 'config.yaml', tmp_path / 'config.pickle'
+    path.write_text(VALID_YAML, encoding='utf-8')
+    snapshot.write_bytes(b'not a pickle')
+
+    assert load_config(str(path), str(snapshot))['territories']
+    assert load_config(str(path), str(snapshot))['territories']
+    assert len(parses) == 1
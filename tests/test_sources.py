@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+import scraper.sources as sources
+from scraper.sources import CircuitBreaker, CircuitBreakers, ScrapeRequest, build_sources
+from test_scraper import kudago_page, scraper
+
+TERRITORY = {'name': 'Москва'}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sources.time, 'time', clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure()
+    clock.now += 61
+    assert breaker.allow()
+    # Пока пробный запрос не вернулся, остальные ждут
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_state_survives_restart(tmp_path, clock):
+    path = str(tmp_path / 'state' / 'breakers.json')
+    source = build_sources({'kudago': {'failure_threshold': 2, 'cooldown': 60}})[0]
+    breakers = CircuitBreakers(path)
+    for _ in range(2):
+        breakers.get('kudago:msk', source).record_failure()
+    breakers.save()
+
+    assert os.listdir(os.path.dirname(path)) == ['breakers.json']
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['kudago:msk']['failures'] == 2
+
+    restored = CircuitBreakers(path).get('kudago:msk', source)
+    assert restored.failures == 2
+    assert not restored.allow()
+
+
+def test_broken_state_file_is_ignored(tmp_path):
+    path = tmp_path / 'breakers.json'
+    path.write_text('{"kudago:msk": ', encoding='utf-8')
+    source = build_sources({'kudago': {}})[0]
+    assert CircuitBreakers(str(path)).get('kudago:msk', source).failures == 0
+
+
+def test_kudago_outage_opens_breaker(clock):
+    events_scraper = scraper({'msk': [503]})
+    events_scraper.sources = build_sources({'kudago': {'failure_threshold': 3, 'cooldown': 600}})
+    calls = []
+    get = events_scraper.http.get
+    events_scraper.http.get = lambda url, **kwargs: calls.append(url) or get(url, **kwargs)
+
+    for _ in range(5):
+        events_scraper.scrape_all(TERRITORY)
+
+    breaker = events_scraper.breakers.get('kudago:msk', events_scraper.sources[0])
+    assert breaker.failures == 3
+    # Открытый предохранитель: два последних запуска KudaGo не опрашивали
+    assert len(calls) == 3
+
+
+def test_empty_kudago_answer_is_not_a_failure():
+    events_scraper = scraper({'msk': [kudago_page('msk', [])]})
+    for _ in range(5):
+        events_scraper.scrape_all(TERRITORY)
+    assert events_scraper.breakers.get('kudago:msk', events_scraper.sources[0]).failures == 0
+
+
+def test_empty_answer_is_failure_when_configured():
+    source = build_sources({'yandex': {}})[0]
+    request = ScrapeRequest(cities=())
+    assert source.is_failure(0, request)
+    assert source.is_failure(None, request)
+    assert not source.is_failure(3, request)
@@ -1,12 +1,24 @@
 #!/usr/bin/env python3
 import os
 from datetime import datetime, timedelta
-import yaml
+
+from settings import load_config
 
 class InteractiveMenu:
     def __init__(self, config_path: str = "config.yaml"):
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+        self.config = load_config(config_path)
+    
+    def _pick(self, section, choice):
+        """Номера через запятую -> ключи секции (пусто = все)"""
+        keys = list(section.keys())
+        if not choice:
+            return keys
+        picked = []
+        for part in choice.split(','):
+            part = part.strip()
+            if part.isdigit() and 1 <= int(part) <= len(keys):
+                picked.append(keys[int(part) - 1])
+        return picked or keys
     
     def clear_screen(self):
         os.system('clear')
@@ -23,14 +35,14 @@ class InteractiveMenu:
             print(f"{i}. {key[1]['name']}")
         
         choice = input("> ").strip()
-        collections = list(self.config['collections'].keys()) if not choice else choice
+        collections = self._pick(self.config['collections'], choice)
         
         print("\nВыберите территории (номера через запятую, Enter = все):")
         for i, key in enumerate(self.config['territories'].items(), 1):
             print(f"{i}. {key[1]['name']}")
         
         choice = input("> ").strip()
-        territories = list(self.config['territories'].keys()) if not choice else choice
+        territories = self._pick(self.config['territories'], choice)
         
         today = datetime.now().date()
         